@@ -0,0 +1,76 @@
+import base64
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class CreatedAtCursorPagination(BasePagination):
+    """
+    Keyset pagination, newest first, keyed on (created_at, id).
+
+    The cursor is the (created_at, id) of the last item of the previous page, so every
+    page is one indexed query whatever the size of the history.
+
+    * page_size: items per page (default 20, max 100)
+    * cursor: "next" of the previous response
+    """
+    page_size = 20
+    max_page_size = 100
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    next_cursor = None
+
+    def encode_cursor(self, obj):
+        position = '%s|%d' % (obj.created_at.isoformat(), obj.pk)
+        return base64.urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split('|')
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            created_at = None
+
+        if created_at is None:
+            raise ValidationError({'error': 'Invalid cursor'})
+
+        return created_at, pk
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            raise ValidationError({'error': 'Invalid page_size'})
+
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        page = list(queryset.order_by('-created_at', '-id')[:page_size + 1])
+
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        else:
+            self.next_cursor = None
+
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.next_cursor),
+            ('results', data),
+        ]))
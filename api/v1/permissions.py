@@ -1,17 +1,13 @@
 from rest_framework import permissions
-from billing.models import BillingInfo
+from billing.entitlements import is_entitled
 
 
 class IsPaid(permissions.BasePermission):
     """
     Allows access only to paid users.
+    NOTE: answered from the entitlement cache and local billing state, never from Stripe.
     """
     message = 'Free version has limited permission.'
 
     def has_permission(self, request, view):
-        try:
-            billing_info = BillingInfo.objects.get(user=request.user)
-            return billing_info.is_active
-
-        except BillingInfo.DoesNotExist:
-            return False
+        return is_entitled(request.user)
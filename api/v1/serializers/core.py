@@ -1,9 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 
-from core.models import Practice, PRACTICE_TYPES, DeltaShotReport, ScoreShotReport
+from core.bitmap import MAX_DISTANCE
+from core.models import Practice, PRACTICE_TYPES, DeltaShotReport, ScoreShotReport, MAX_SCORE_CARD_SCORE
+from core.rollups import add_score_shots
+from core.report_cache import invalidate_reports
 from billing.models import BillingInfo
-from constant.models import AimValueRange, TrajectoryValueRange
+from constant.registry import get_constants
 from profiles.models import ClubBag
 
 
@@ -62,7 +67,7 @@ class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('username', 'email', 'first_name', 'last_name',
-                  'handicap', 'birthday', 'location', 'years_of_experience', 'creation_time', 'photo',
+                  'handicap', 'birthday', 'location', 'years_of_experience', 'creation_time', 'photo', 'timezone',
                   'subscription_status', 'clubs')
         read_only_fields = ('username', 'email', 'subscription_status', 'photo')
 
@@ -88,6 +93,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         instance.location = validated_data.get('location', instance.location)
         instance.years_of_experience = validated_data.get('years_of_experience', instance.years_of_experience)
         instance.creation_time = validated_data.get('creation_time', instance.creation_time)
+        instance.timezone = validated_data.get('timezone', instance.timezone)
         instance.save()
 
         new_club_ids = []
@@ -127,6 +133,7 @@ class DeltaShotSerializer(serializers.ModelSerializer):
         model = DeltaShotReport
         fields = ('distance', 'aim', 'trajectory', 'club', 'hit', 'delta', 'reported_at')
         read_only_fields = ('reported_at', )
+        extra_kwargs = {'distance': {'max_value': MAX_DISTANCE}}
 
     def __init__(self, *args, **kwargs):
         super(DeltaShotSerializer, self).__init__(*args, **kwargs)
@@ -136,17 +143,14 @@ class DeltaShotSerializer(serializers.ModelSerializer):
         self.fields['trajectory'].error_messages['required'] = 'Trajectory value is required'
 
     def validate_aim(self, value):
-        try:
-            aim_obj = AimValueRange.objects.get(description__iexact=value)
-        except Exception:
+        if not get_constants().is_valid_aim(value):
             raise serializers.ValidationError("Invalid Aim Value")
         return value
 
     def validate_trajectory(self, value):
-        if TrajectoryValueRange.objects.filter(description__iexact=value).count() > 0:
-            return value
-        else:
+        if not get_constants().is_valid_trajectory(value):
             raise serializers.ValidationError("Invalid Trajectory Value")
+        return value
 
 
 class ScoreShotSerializer(serializers.ModelSerializer):
@@ -175,10 +179,24 @@ class ScoreCardReportSerializer(serializers.Serializer):
         if len(score_card) < 1:
             raise serializers.ValidationError("Empty Score Card")
 
-        practice = Practice.objects.create(user=self.context['request'].user, practice_type=practice_type)
-
-        for turn in score_card:
-            ScoreShotReport.objects.create(practice=practice, putt_counts=turn['putt_counts'], points=turn['points'])
+        with transaction.atomic():
+            # practice stats are known up front, so they are inserted with the practice
+            practice = Practice.objects.create(
+                user=self.context['request'].user,
+                practice_type=practice_type,
+                shot_count=len(score_card),
+                score=sum(turn['points'] for turn in score_card),
+                max_score=MAX_SCORE_CARD_SCORE,
+                last_reported_at=timezone.now(),
+            )
+
+            shots = ScoreShotReport.objects.bulk_create([
+                ScoreShotReport(practice=practice, putt_counts=turn['putt_counts'], points=turn['points'])
+                for turn in score_card
+            ])
+
+            add_score_shots(practice, shots)
+            invalidate_reports(practice.user_id)
 
         return validated_data
 
@@ -188,7 +206,7 @@ class PracticeSerializer(serializers.ModelSerializer):
     class Meta:
         # Read only Serializer
         model = Practice
-        fields = ('id', 'practice_type', 'created_at', 'score', 'max_score')
+        fields = ('id', 'practice_type', 'created_at', 'last_reported_at', 'score', 'max_score')
 
 
 class CustomPracticeSerializer(serializers.Serializer):
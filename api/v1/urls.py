@@ -48,9 +48,11 @@ urlpatterns = [
 
     # report
     url(r'^report/practice/(?P<practice_id>\d+)/$', DeltaReportView.as_view()),
+    url(r'^report/practice/(?P<practice_id>\d+)/batch/$', DeltaReportBatchView.as_view()),
     url(r'^report/scorecard/$', ScoreCardReportView.as_view()),
 
     url(r'^history/list/$', HistoryListView.as_view()),
+    url(r'^history/page/$', HistoryPageView.as_view()),
     url(r'^history/detail/(?P<practice_id>\d+)/$', HistoryDetailView.as_view()),
 
     # diff range
@@ -1,5 +1,5 @@
 from .constant import DistanceDiffList, AimDiffList, TrajectoryDiffList, PuttingDiffView, ClubTypeListView
-from .core import DeltaReportView, ScoreCardReportView, HistoryListView, HistoryDetailView, PricingInfoView, PracticeTypeListView, \
+from .core import DeltaReportView, DeltaReportBatchView, ScoreCardReportView, HistoryListView, HistoryPageView, HistoryDetailView, PricingInfoView, PracticeTypeListView, \
     GatedRandomPracticeView, PuttingRandomPracticeView, WarmupPracticeView, StandardPuttingView, \
     BlockPracticeView, SerialPracticeView, PitchPracticeView, ChipPracticeView, CustomPracticeView, CustomPuttingView
 
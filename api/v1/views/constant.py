@@ -3,7 +3,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from api.v1.serializers import AimDiffSerializer, TrajectoryDiffSerializer, DistanceDiffSerializer, PuttingAimSerializer, PuttingDistSerializer, ClubTypeSerializer
-from constant.models import AimDiffRange, TrajectoryDiffRange, DistanceDiffRange, PuttingAimRange, PuttingDistRange, ClubType
+from constant.registry import get_constants
 
 
 class DistanceDiffList(generics.ListAPIView):
@@ -11,7 +11,9 @@ class DistanceDiffList(generics.ListAPIView):
     API endpoint for Distance Difference Range
     """
     serializer_class = DistanceDiffSerializer
-    queryset = DistanceDiffRange.objects.all()
+
+    def get_queryset(self):
+        return get_constants().distance_diffs
 
 
 class AimDiffList(generics.ListAPIView):
@@ -19,7 +21,9 @@ class AimDiffList(generics.ListAPIView):
     API endpoint for Aim Difference Range
     """
     serializer_class = AimDiffSerializer
-    queryset = AimDiffRange.objects.all()
+
+    def get_queryset(self):
+        return get_constants().aim_diffs
 
 
 class TrajectoryDiffList(generics.ListAPIView):
@@ -27,14 +31,17 @@ class TrajectoryDiffList(generics.ListAPIView):
     API endpoint for Trajectory Difference Range
     """
     serializer_class = TrajectoryDiffSerializer
-    queryset = TrajectoryDiffRange.objects.all()
+
+    def get_queryset(self):
+        return get_constants().trajectory_diffs
 
 
 class PuttingDiffView(APIView):
     def get(self, request, *args, **kwargs):
+        constants = get_constants()
         return Response({
-            "aim": PuttingAimSerializer(list(PuttingAimRange.objects.all()), many=True).data,
-            "dist": PuttingDistSerializer(list(PuttingDistRange.objects.all()), many=True).data
+            "aim": PuttingAimSerializer(constants.putting_aims, many=True).data,
+            "dist": PuttingDistSerializer(constants.putting_dists, many=True).data
         })
 
 
@@ -44,4 +51,6 @@ class ClubTypeListView(generics.ListAPIView):
     (id, name)
     """
     serializer_class = ClubTypeSerializer
-    queryset = ClubType.objects.all()
+
+    def get_queryset(self):
+        return get_constants().club_types
@@ -1,4 +1,10 @@
 from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags
 
 from rest_framework import viewsets, status
 from rest_framework.exceptions import ValidationError
@@ -8,21 +14,26 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 
 from collections import OrderedDict
+import datetime
 import random
 import itertools
 
 from api.v1.serializers import ShotSerializer, Shot, PracticeSerializer, CustomPracticeSerializer, \
     DeltaShotSerializer, ScoreCardReportSerializer, ScoreShotSerializer, CustomPuttingSerializer
 
-from billing.models import StripeInfo
+from billing.pricing import get_pricing
 from core.models import PRACTICE_TYPES, Practice, DeltaShotReport
-from constant.models import TrajectoryValueRange, AimValueRange, ShotImage, WARMUP_PRACTICE_LIST
+from constant.models import WARMUP_PRACTICE_LIST
+from constant.registry import get_constants
+from profiles.club_index import get_club_index
+from core.rollups import add_delta_shots
+from core.report_cache import invalidate_reports
 from core.utils import pick_random_distances, pick_standard_putts, get_blocked_bin, \
     pick_chip_distances, pick_pitch_distances, pick_custom_distances
+from api.v1.pagination import CreatedAtCursorPagination
 from api.v1.permissions import IsPaid
 
 from oauth2_provider.contrib.rest_framework import TokenHasReadWriteScope, OAuth2Authentication
-from constant.models import YardBucket, FeetBucket
 
 
 def make_fullswing_shots(dist_list, practice_type):
@@ -31,8 +42,9 @@ def make_fullswing_shots(dist_list, practice_type):
     :param practice_type:
     :return: shotserializer
     """
-    aim_list = AimValueRange.objects.all()
-    trajectory_list = TrajectoryValueRange.objects.filter(type='long')
+    constants = get_constants()
+    aim_list = constants.aim_values
+    trajectory_list = constants.get_trajectories('long')
 
     shot_list = []
 
@@ -41,19 +53,7 @@ def make_fullswing_shots(dist_list, practice_type):
         if dist >= settings.DIST_FOR_SHAPE:
             aim = random.choice(aim_list)
             traj = random.choice(trajectory_list)
-
-            try:
-                if aim.is_draw:
-                    shape = ShotImage.objects.get(name='draw')
-                elif aim.is_straight:
-                    shape = ShotImage.objects.get(name='straight')
-                elif aim.is_fade:
-                    shape = ShotImage.objects.get(name='fade')
-                else:
-                    shape = None
-
-            except ShotImage.DoesNotExist:
-                shape = None
+            shape = constants.get_shape(aim)
 
         else:
             shape = None
@@ -68,6 +68,24 @@ def make_fullswing_shots(dist_list, practice_type):
     return serializer
 
 
+def save_delta_reports(practice, shots):
+    """
+    :param practice:
+    :param shots: unsaved DeltaShotReport objects of the practice
+    :return: saved shots (inserted at once, with the practice stats and rollups in the same transaction)
+    """
+    for shot in shots:
+        shot.set_delta_fields()
+
+    with transaction.atomic():
+        shots = DeltaShotReport.objects.bulk_create(shots)
+        practice.add_delta_reports(shots)
+        add_delta_shots(practice, shots)
+        invalidate_reports(practice.user_id)
+
+    return shots
+
+
 class GetPracticeMixin(object):
 
     def get_practice_obj(self, request, *args, **kwargs):
@@ -78,7 +96,7 @@ class GetPracticeMixin(object):
         practice_id = int(practice_id)
 
         try:
-            practice_obj = Practice.objects.get(user=request.user, id=practice_id)
+            practice_obj = Practice.objects.select_related('user').get(user=request.user, id=practice_id)
         except Practice.DoesNotExist:
             return None
 
@@ -97,7 +115,7 @@ class UnlmitedModeMixin(object):
             practice_obj = Practice.objects.create(user=request.user, practice_type=self.practice_type)
         else:
             try:
-                practice_obj = Practice.objects.get(user=request.user, id=practice_id)
+                practice_obj = Practice.objects.select_related('user').get(user=request.user, id=practice_id)
             except Practice.DoesNotExist:
                 return None
         return practice_obj
@@ -139,11 +157,65 @@ class DeltaReportView(GetPracticeMixin, generics.CreateAPIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer.save(practice=practice_obj)
+        save_delta_reports(practice_obj, [DeltaShotReport(practice=practice_obj, **serializer.validated_data)])
 
         return Response(request.data, status=status.HTTP_201_CREATED)
 
 
+class DeltaReportBatchView(GetPracticeMixin, APIView):
+    """
+    Report many shots of a practice at once (e.g: a whole session or an offline queue)
+
+    - body: list of shots, same format as /report/practice/<id>/
+    - response: one result per shot, in the same order
+        * {"status": 201}: saved
+        * {"status": 400, "errors": {...}}: invalid, not saved
+    - status code: 201 (all saved), 207 (some saved), 400 (none saved)
+    """
+
+    authentication_classes = [OAuth2Authentication, ]
+    permission_classes = [IsAuthenticated, ]
+
+    max_batch_size = 500
+
+    def post(self, request, *args, **kwargs):
+        practice_obj = self.get_practice_obj(request, *args, **kwargs)
+        if practice_obj is None:
+            return Response({'error': 'Invalid Practice'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if practice_obj.practice_type == PRACTICE_TYPES.warmup:
+            return Response({'error': 'Report is not allowed in WARM UP mode.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not isinstance(request.data, list) or not request.data:
+            return Response({'error': 'A list of shots is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(request.data) > self.max_batch_size:
+            return Response({'error': 'Too many shots (max: %d)' % self.max_batch_size},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        shots = []
+        results = []
+        for item in request.data:
+            serializer = DeltaShotSerializer(data=item)
+            if serializer.is_valid():
+                shots.append(DeltaShotReport(practice=practice_obj, **serializer.validated_data))
+                results.append({'status': status.HTTP_201_CREATED})
+            else:
+                results.append({'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors})
+
+        if shots:
+            save_delta_reports(practice_obj, shots)
+
+        if len(shots) == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif shots:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response({'created': len(shots), 'results': results}, status=response_status)
+
+
 class ScoreCardReportView(generics.CreateAPIView):
 
     authentication_classes = [OAuth2Authentication, ]
@@ -162,19 +234,81 @@ class HistoryListView(APIView):
     permission_classes = [IsAuthenticated, ]
 
     def get(self, request, *args, **kwargs):
-        practices = Practice.objects.filter(user=request.user)
-
-        histories = []
-        for p in practices:
-            if not p.is_valid:
-                continue
-            histories.append(p)
+        practices = Practice.objects.filter(user=request.user, shot_count__gt=0)
 
-        serializer = PracticeSerializer(histories, many=True)
+        serializer = PracticeSerializer(practices, many=True)
 
         return Response(serializer.data)
 
 
+class HistoryPageView(APIView):
+    """
+    History, newest first, paginated by cursor
+
+    - page_size: items per page (default 20, max 100)
+    - cursor: "next" of the previous page
+    - practice_type: e.g: "0,4" (optional)
+    - start, end: e.g: "2019-01-31" (optional, UTC days)
+    - since: e.g: "2019-01-31T10:00:00Z", only sessions reported (new shots or score) after it (optional),
+      use the latest "last_reported_at" of the previous sync
+    """
+
+    authentication_classes = [OAuth2Authentication, ]
+    permission_classes = [IsAuthenticated, ]
+
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self, request):
+        practices = Practice.objects.filter(user=request.user, shot_count__gt=0)
+        params = request.query_params
+
+        practice_types = params.get('practice_type')
+        if practice_types:
+            try:
+                practice_types = [int(p_type) for p_type in practice_types.split(',')]
+            except ValueError:
+                raise ValidationError({'error': 'Invalid practice_type'})
+            practices = practices.filter(practice_type__in=practice_types)
+
+        start = params.get('start')
+        if start:
+            practices = practices.filter(created_at__gte=self.parse_day(start, 'start'))
+
+        end = params.get('end')
+        if end:
+            practices = practices.filter(created_at__lt=self.parse_day(end, 'end') + datetime.timedelta(days=1))
+
+        since = params.get('since')
+        if since:
+            try:
+                since_time = parse_datetime(since)
+            except ValueError:  # well formed but invalid, e.g. month 13
+                since_time = None
+            if since_time is None:
+                raise ValidationError({'error': 'Invalid since'})
+            if timezone.is_naive(since_time):
+                since_time = timezone.make_aware(since_time, timezone.utc)
+            # NOTE: not created_at, unlimited mode sessions are created before their shots are reported
+            practices = practices.filter(last_reported_at__gt=since_time)
+
+        return practices
+
+    def parse_day(self, value, name):
+        try:
+            day = datetime.datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise ValidationError({'error': 'Invalid %s' % name})
+        return timezone.make_aware(day, timezone.utc)
+
+    def get(self, request, *args, **kwargs):
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(self.get_queryset(request), request, view=self)
+
+        serializer = PracticeSerializer(page, many=True)
+
+        return paginator.get_paginated_response(serializer.data)
+
+
 class HistoryDetailView(GetPracticeMixin, APIView):
     authentication_classes = [OAuth2Authentication, ]
     permission_classes = [IsAuthenticated, ]
@@ -184,7 +318,7 @@ class HistoryDetailView(GetPracticeMixin, APIView):
         if practice_obj is None or not practice_obj.is_valid:
             return Response({'error': 'Invalid Practice'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if practice_obj.practice_type in [PRACTICE_TYPES.standard_putting, PRACTICE_TYPES.within_3feet, PRACTICE_TYPES.challenge_6foot]:
+        if practice_obj.is_score_card:
             serializer = ScoreShotSerializer(practice_obj.reports, many=True)
         else:
             serializer = DeltaShotSerializer(practice_obj.reports, many=True)
@@ -211,7 +345,8 @@ class GatedRandomPracticeView(UnlmitedModeMixin, APIView):
         practice = self.get_practice_obj(request, *args, **kwargs)
         if practice is None:
             return Response({'error': 'Invalid Practice'}, status=status.HTTP_400_BAD_REQUEST)
-        dist_list = pick_random_distances(putting=False, practice=practice, driver=request.user.longest_distance, clubs=request.user.clubs)
+        dist_list = pick_random_distances(putting=False, practice=practice, driver=request.user.longest_distance,
+                                          club_index=get_club_index(request.user))
         serializer = make_fullswing_shots(dist_list, self.practice_type)
 
         return Response(OrderedDict([
@@ -239,7 +374,7 @@ class PuttingRandomPracticeView(UnlmitedModeMixin, APIView):
             return Response({'error': 'Invalid Practice'}, status=status.HTTP_400_BAD_REQUEST)
 
         dist_list = pick_random_distances(putting=True, practice=practice)
-        trajectory_list = TrajectoryValueRange.objects.filter(type='putting')
+        trajectory_list = get_constants().get_trajectories('putting')
         # shape_list = ShotImage.objects.all()
 
         shot_list = []
@@ -275,6 +410,7 @@ class WarmupPracticeView(APIView):
 
     def get(self, request, format=None):
         warmup_practice = random.choice(WARMUP_PRACTICE_LIST)
+        constants = get_constants()
 
         shot_list = []
 
@@ -289,32 +425,15 @@ class WarmupPracticeView(APIView):
 
             aim_name = shot.get('aim', None)
             if aim_name is not None:
-                try:
-                    aim = AimValueRange.objects.get(description=aim_name)
-                    if dist >= settings.DIST_FOR_SHAPE:
-                        try:
-                            if aim.is_draw:
-                                shape = ShotImage.objects.get(name='draw')
-                            elif aim.is_straight:
-                                shape = ShotImage.objects.get(name='straight')
-                            elif aim.is_fade:
-                                shape = ShotImage.objects.get(name='fade')
-                            else:
-                                shape = None
-
-                        except ShotImage.DoesNotExist:
-                            pass
-                except AimValueRange.DoesNotExist:
-                    pass
+                aim = constants.get_aim(aim_name)
+                if aim is not None and dist >= settings.DIST_FOR_SHAPE:
+                    shape = constants.get_shape(aim)
             # traj
             traj = None
             traj_name = shot.get('traj', None)
 
             if traj_name is not None:
-                try:
-                    traj = TrajectoryValueRange.objects.get(description=traj_name, type='long')
-                except TrajectoryValueRange.DoesNotExist:
-                    pass
+                traj = constants.get_trajectory(traj_name, 'long')
 
             # make shot object
             shot = Shot(shape=shape, dist=dist, aim=aim, traj=traj)
@@ -346,7 +465,7 @@ class StandardPuttingView(APIView):
         practice = Practice.objects.create(user=request.user, practice_type=self.practice_type)
 
         dist_list = pick_standard_putts()
-        trajectory_list = TrajectoryValueRange.objects.filter(type='putting')
+        trajectory_list = get_constants().get_trajectories('putting')
         # shape_list = ShotImage.objects.all()
 
         shot_list = []
@@ -377,12 +496,17 @@ class PricingInfoView(APIView):
     """
 
     def get(self, request, format=None):
-        subs_fee = StripeInfo.get_subscription_price()
+        # NOTE: precomputed response (billing.pricing), no query on this path
+        pricing = get_pricing()
 
-        return Response(OrderedDict([
-            ("public_key", settings.STRIPE_PUBLIC_KEY),
-            ("subs_fee", str(subs_fee))])
-        )
+        if pricing.etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(pricing.body, content_type='application/json')
+
+        response['ETag'] = pricing.etag
+        patch_cache_control(response, no_cache=True)
+        return response
 
 
 # -----------------------------
@@ -410,7 +534,7 @@ class PitchPracticeView(UnlmitedModeMixin, APIView):
             return Response({'error': 'Invalid Practice'}, status=status.HTTP_400_BAD_REQUEST)
 
         dist_list = pick_pitch_distances()
-        pitch_traj = TrajectoryValueRange.objects.get(type='pitch')
+        pitch_traj = get_constants().get_trajectories('pitch')[0]
 
         shot_list = []
 
@@ -453,7 +577,7 @@ class ChipPracticeView(UnlmitedModeMixin, APIView):
             return Response({'error': 'Invalid Practice'}, status=status.HTTP_400_BAD_REQUEST)
 
         dist_list = pick_chip_distances()
-        chip_traj = TrajectoryValueRange.objects.get(type='chip')
+        chip_traj = get_constants().get_trajectories('chip')[0]
 
         shot_list = []
 
@@ -540,10 +664,9 @@ class SerialPracticeView(APIView):
         last_custom_practice = DeltaShotReport.objects.filter(practice__in=practice_list).order_by('-reported_at')[0]
         last_min_dist = last_custom_practice.distance
 
-        yards = YardBucket.objects.all()
-        for yard in yards:
+        for yard in get_constants().yard_buckets:
             if last_min_dist in range(yard.min, yard.max):
-                blocked_bin = YardBucket.objects.get(min=yard.min)
+                blocked_bin = yard
 
         if blocked_bin is None and last_min_dist is not None:
             blocked_bin = last_min_dist
@@ -702,7 +825,7 @@ class CustomPuttingView(UnlmitedModeMixin, APIView):
 
         dist_list = pick_custom_distances(serializer.validated_data['min_dist'],
                                           serializer.validated_data['max_dist'])
-        trajectory_list = TrajectoryValueRange.objects.filter(type='putting')
+        trajectory_list = get_constants().get_trajectories('putting')
 
         shot_list = []
 
@@ -1,11 +1,9 @@
-from django.conf import settings
 import datetime
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
 
 from rest_framework import status
 from rest_framework import generics
-import pytz
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -13,6 +11,7 @@ from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 
 from api.v1.serializers import ProfileSerializer, RegisterSerializer
 
+from billing import gateway
 from billing.models import BillingInfo, StripeInfo
 
 from oauth2_provider.models import get_application_model
@@ -21,9 +20,6 @@ import stripe
 import json
 import math
 
-stripe.api_key = settings.STRIPE_PRIVATE_KEY
-stripe.api_version = '2018-02-28'
-
 Client = get_application_model()
 User = get_user_model()
 
@@ -134,25 +130,28 @@ class BillingRegisterView(APIView):
         try:
             if billing_obj.customer_id is None:
                 # create customer
-                cus_resp = stripe.Customer.create(
+                cus_resp = gateway.call(
+                    'customer.create', stripe.Customer.create,
                     source=stripe_token,
                     email=user.email
                 )
             else:
                 # retrive customer
                 try:
-                    cus_resp = stripe.Customer.retrieve(billing_obj.customer_id)
+                    cus_resp = gateway.call('customer.retrieve', stripe.Customer.retrieve, billing_obj.customer_id)
                     cus_resp.source = stripe_token
-                    cus_resp.save()
+                    gateway.call('customer.save', cus_resp.save)
 
                 except stripe.error.InvalidRequestError:  # InvalidRequestError ('No such customer: 123456',)
                     # create customer
-                    cus_resp = stripe.Customer.create(
+                    cus_resp = gateway.call(
+                        'customer.create', stripe.Customer.create,
                         source=stripe_token,
                         email=user.email
                     )
 
             billing_obj.customer_id = cus_resp['id']
+            billing_obj.apply_customer(cus_resp)
 
         except Exception as create_cus_exception:
             return Response({"Invalid request": str(create_cus_exception)}, status=status.HTTP_400_BAD_REQUEST)
@@ -163,7 +162,8 @@ class BillingRegisterView(APIView):
             return Response(status=status.HTTP_200_OK)
 
         try:
-            subs_resp = stripe.Subscription.create(
+            subs_resp = gateway.call(
+                'subscription.create', stripe.Subscription.create,
                 customer=billing_obj.customer_id,
                 items=[
                     {
@@ -173,10 +173,7 @@ class BillingRegisterView(APIView):
             )
 
             billing_obj.subscription_id = subs_resp['id']
-            billing_obj.subscription_status = subs_resp['status']
-            billing_obj.created = datetime.datetime.fromtimestamp(subs_resp['created'], tz=pytz.UTC)
-            billing_obj.current_period_start = datetime.datetime.fromtimestamp(subs_resp['current_period_start'], tz=pytz.UTC)
-            billing_obj.current_period_end = datetime.datetime.fromtimestamp(subs_resp['current_period_end'], tz=pytz.UTC)
+            billing_obj.apply_subscription(subs_resp)
 
             billing_obj.save()
 
@@ -1 +1 @@
-
+default_app_config = 'billing.apps.BillingConfig'
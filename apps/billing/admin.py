@@ -1,15 +1,24 @@
 from django.contrib import admin
 
-from .models import BillingInfo, StripeInfo
+from .models import BillingInfo, StripeEvent, StripeInfo
 
 
 class BillingInfoAdmin(admin.ModelAdmin):
-    list_display = ('user', 'subscription_status', 'created', 'current_period_start', 'current_period_end')
+    list_display = ('user', 'subscription_status', 'created', 'current_period_start', 'current_period_end',
+                    'stripe_synced_at')
     readonly_fields = ('user', 'subscription_status',
-                       'created', 'current_period_start', 'current_period_end',
+                       'created', 'current_period_start', 'current_period_end', 'stripe_synced_at',
                        'customer_id', 'subscription_id', 'subscription_status',
-                       'last4', 'exp_year', 'exp_month', 'brand')
+                       'last4', 'exp_year', 'exp_month', 'brand', 'card_source_id', 'card_synced_at')
+
+
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'type', 'created', 'received_at')
+    list_filter = ('type', )
+    search_fields = ('event_id', )
+    readonly_fields = ('event_id', 'type', 'created', 'received_at')
 
 
 admin.site.register(BillingInfo, BillingInfoAdmin)
+admin.site.register(StripeEvent, StripeEventAdmin)
 admin.site.register(StripeInfo)
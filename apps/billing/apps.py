@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class BillingConfig(AppConfig):
     name = 'billing'
+
+    def ready(self):
+        from billing import entitlements, pricing
+        entitlements.connect_signals()
+        pricing.connect_signals()
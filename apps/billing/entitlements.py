@@ -0,0 +1,49 @@
+"""
+Cached answers to "is this user paid?" for the permission checks of the API.
+
+The answer comes from BillingInfo (see BillingInfo.is_active, which never calls Stripe)
+and is cached for settings.ENTITLEMENT_CACHE_TTL seconds, or until the end of the
+billing period if that comes first. Saving or deleting the BillingInfo drops it.
+"""
+from datetime import datetime
+
+import pytz
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from billing.models import BillingInfo
+
+
+def entitlement_key(user_id):
+    return 'billing:entitlement:%s' % user_id
+
+
+def is_entitled(user):
+    key = entitlement_key(user.pk)
+
+    active = cache.get(key)
+    if active is None:
+        billing_info = BillingInfo.objects.filter(user=user).first()
+        active = billing_info is not None and billing_info.is_active
+
+        timeout = settings.ENTITLEMENT_CACHE_TTL
+        if billing_info is not None and billing_info.current_period_end is not None:
+            remaining = (billing_info.current_period_end - datetime.now(tz=pytz.UTC)).total_seconds()
+            if remaining > 0:
+                timeout = min(timeout, int(remaining) + 1)
+
+        cache.set(key, active, timeout)
+
+    return active
+
+
+def invalidate_entitlement(sender, instance, **kwargs):
+    key = entitlement_key(instance.user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def connect_signals():
+    post_save.connect(invalidate_entitlement, sender=BillingInfo, dispatch_uid='entitlement_save')
+    post_delete.connect(invalidate_entitlement, sender=BillingInfo, dispatch_uid='entitlement_delete')
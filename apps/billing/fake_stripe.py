@@ -0,0 +1,100 @@
+"""
+Local HTTP server answering GET /v1/subscriptions/<id> like the Stripe API, to run
+"scan_subscribers" against many subscribers without calling Stripe
+(stripe.api_base = server URL, see "fake_stripe_server" and "bench_reconcile").
+
+Subscriptions are derived from their id, so no state is kept: ids not starting with
+"sub_" are unknown (404), and every CHANGED_EVERY-th subscription is past_due.
+"""
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+import json
+import random
+import threading
+import time
+import zlib
+
+SUBSCRIPTION_PATH = '/v1/subscriptions/'
+PERIOD_START = 1546300800  # 2019-01-01 UTC
+PERIOD_LENGTH = 30 * 86400
+CHANGED_EVERY = 10
+
+
+def fake_subscription(subscription_id):
+    status = 'past_due' if zlib.crc32(subscription_id.encode()) % CHANGED_EVERY == 0 else 'active'
+    return {
+        'id': subscription_id,
+        'object': 'subscription',
+        'status': status,
+        'created': PERIOD_START,
+        'current_period_start': PERIOD_START,
+        'current_period_end': PERIOD_START + PERIOD_LENGTH,
+    }
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.error_rate and random.random() < server.error_rate:
+            return self.send_json(429, {'error': {'type': 'rate_limit_error', 'message': 'Too many requests'}})
+
+        if not self.path.startswith(SUBSCRIPTION_PATH):
+            return self.send_json(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown path'}})
+
+        subscription_id = self.path[len(SUBSCRIPTION_PATH):].split('?')[0]
+        if not subscription_id.startswith('sub_'):
+            return self.send_json(404, {'error': {'type': 'invalid_request_error',
+                                                  'message': 'No such subscription: %s' % subscription_id,
+                                                  'param': 'id'}})
+
+        self.send_json(200, fake_subscription(subscription_id))
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeStripeServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0, error_rate=0):
+        """
+        :param latency: seconds per request
+        :param error_rate: share of the requests answered with 429 (rate limited)
+        """
+        super().__init__(address, FakeStripeHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # NOTE: clients that reached their deadline close the connection before the answer
+        pass
+
+    @property
+    def url(self):
+        return 'http://%s:%s' % self.server_address[:2]
+
+
+def start_server(host='127.0.0.1', port=0, **kwargs):
+    """
+    :return: FakeStripeServer serving in a daemon thread (port 0: any free port)
+    """
+    server = FakeStripeServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,179 @@
+"""
+Gateway of every Stripe API call: call(operation, func, *args, **kwargs).
+
+Each call gets a deadline (settings.STRIPE_TIMEOUT by default), and the HTTP client
+of the stripe package bounds the connect and read timeouts of the request by the
+time left. A circuit breaker shared by the process counts consecutive failures of
+Stripe (connection errors, timeouts, 5xx, 429): after settings.STRIPE_BREAKER_THRESHOLD
+of them, calls fail fast with StripeUnavailable for settings.STRIPE_BREAKER_RESET
+seconds, then a single trial call decides whether it closes again. Calls, errors and
+latencies per operation are counted in get_stats().
+"""
+from collections import defaultdict
+import logging
+import threading
+import time
+
+import stripe
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# errors of Stripe itself, card and request errors do not count as failures
+FAILURE_ERRORS = (stripe.error.APIConnectionError, stripe.error.APIError, stripe.error.RateLimitError)
+MIN_TIMEOUT = 0.1
+
+_call = threading.local()
+
+
+class StripeUnavailable(stripe.error.APIConnectionError):
+    """
+    Raised without calling Stripe while the circuit breaker is open.
+    """
+
+
+class StripeTimeout(stripe.error.APIConnectionError):
+    """
+    The call did not finish before its deadline.
+    """
+
+
+class DeadlineRequestsClient(stripe.http_client.RequestsClient):
+    """
+    RequestsClient whose timeout is the time left before the deadline of the current call.
+    """
+
+    @property
+    def _timeout(self):
+        deadline = getattr(_call, 'deadline', None)
+        if deadline is None:
+            return self._default_timeout
+        return max(deadline - time.monotonic(), MIN_TIMEOUT)
+
+    @_timeout.setter
+    def _timeout(self, value):
+        self._default_timeout = value
+
+
+class CircuitBreaker(object):
+    """
+    closed -> open after :param threshold: consecutive failures -> one trial call after :param reset: seconds
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, threshold, reset):
+        self.threshold = threshold
+        self.reset = reset
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset:
+                self.state = self.HALF_OPEN  # NOTE: only this call goes through until it succeeds or fails
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    logger.warning('Stripe circuit breaker opened after %d failures', self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class CallStats(object):
+    """
+    Counters per operation, for this process.
+    """
+    FIELDS = ('calls', 'errors', 'failures', 'timeouts', 'rejected', 'latency_total', 'latency_max')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+
+    def record(self, operation, latency=None, **counts):
+        with self.lock:
+            counters = self.counters[operation]
+            for name, count in counts.items():
+                counters[name] += count
+            if latency is not None:
+                counters['calls'] += 1
+                counters['latency_total'] += latency
+                counters['latency_max'] = max(counters['latency_max'], latency)
+
+    def snapshot(self):
+        with self.lock:
+            return {operation: dict(counters) for operation, counters in self.counters.items()}
+
+
+# NOTE: every Stripe call goes through this module, the key and API version are only set here
+stripe.api_key = settings.STRIPE_PRIVATE_KEY
+stripe.api_version = settings.STRIPE_API_VERSION
+stripe.default_http_client = DeadlineRequestsClient(timeout=settings.STRIPE_TIMEOUT,
+                                                    verify_ssl_certs=stripe.verify_ssl_certs, proxy=stripe.proxy)
+breaker = CircuitBreaker(settings.STRIPE_BREAKER_THRESHOLD, settings.STRIPE_BREAKER_RESET)
+stats = CallStats()
+
+
+def call(operation, func, *args, timeout=None, **kwargs):
+    """
+    :param operation: name of the call in the stats, e.g. 'customer.create'
+    :param func: Stripe function, called with param:args and param:kwargs
+    :param timeout: deadline in seconds (default: settings.STRIPE_TIMEOUT)
+    :return: result of param:func
+    """
+    if not breaker.allow():
+        stats.record(operation, rejected=1)
+        raise StripeUnavailable('Stripe is unavailable, please try again later')
+
+    timeout = timeout or settings.STRIPE_TIMEOUT
+    start = time.monotonic()
+    _call.deadline = start + timeout
+    try:
+        result = func(*args, **kwargs)
+
+    except FAILURE_ERRORS as e:
+        latency = time.monotonic() - start
+        timed_out = latency >= timeout
+        stats.record(operation, latency, errors=1, failures=1, timeouts=int(timed_out))
+        breaker.failure()
+        if timed_out:
+            raise StripeTimeout('Stripe did not answer %s within %.1f s' % (operation, timeout)) from e
+        raise
+
+    except stripe.error.StripeError:
+        stats.record(operation, time.monotonic() - start, errors=1)
+        breaker.success()
+        raise
+
+    except Exception:
+        # NOTE: any other error (e.g. a bad response) still ends the half-open trial, or the breaker stays stuck
+        stats.record(operation, time.monotonic() - start, errors=1, failures=1)
+        breaker.failure()
+        raise
+
+    finally:
+        _call.deadline = None
+
+    stats.record(operation, time.monotonic() - start)
+    breaker.success()
+    return result
+
+
+def get_stats():
+    """
+    :return: {operation: counters} of this process, latencies in seconds
+    """
+    return stats.snapshot()
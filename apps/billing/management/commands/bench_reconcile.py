@@ -0,0 +1,80 @@
+from datetime import datetime
+import time
+
+import pytz
+import stripe
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from billing import fake_stripe
+from billing.models import BillingInfo
+from billing.reconcile import reconcile
+
+
+User = get_user_model()
+
+
+def create_subscribers(count):
+    """
+    Every tenth subscription is past_due in the fake Stripe (changed), every hundredth is unknown (failed).
+    """
+    users = User.objects.bulk_create(
+        [User(username='bench_reconcile_%d' % i, email='bench_reconcile_%d@example.com' % i) for i in range(count)],
+        batch_size=5000)
+
+    period_start = datetime.fromtimestamp(fake_stripe.PERIOD_START, tz=pytz.UTC)
+    period_end = datetime.fromtimestamp(fake_stripe.PERIOD_START + fake_stripe.PERIOD_LENGTH, tz=pytz.UTC)
+    BillingInfo.objects.bulk_create([
+        BillingInfo(user=user, customer_id='cus_%d' % i,
+                    subscription_id=('missing_%d' if i % 100 == 0 else 'sub_%d') % i,
+                    subscription_status='active', created=period_start,
+                    current_period_start=period_start, current_period_end=period_end)
+        for i, user in enumerate(users)
+    ], batch_size=5000)
+
+
+class Command(BaseCommand):
+    help = "Reconcile synthetic subscribers against a local fake Stripe (billing.fake_stripe), " \
+           "serially like the previous scan_subscribers and with the thread pool. All rows are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=100000)
+        parser.add_argument('--serial-sample', type=int, default=500,
+                            help='subscribers refreshed one by one for the baseline')
+        parser.add_argument('--latency', type=float, default=0.05, help='seconds per fake Stripe request')
+        parser.add_argument('--error-rate', type=float, default=0.01, help='share of requests answered with 429')
+        parser.add_argument('--workers', type=int, default=32)
+        parser.add_argument('--rate', type=float, default=500, help='requests per second')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        server = fake_stripe.start_server(latency=options['latency'], error_rate=options['error_rate'])
+        stripe.api_base = server.url
+
+        try:
+            with transaction.atomic():
+                create_subscribers(options['subscribers'])
+                subscribers = BillingInfo.objects.filter(user__username__startswith='bench_reconcile_')
+
+                # previous command: one blocking request and one UPDATE per subscriber
+                start = time.perf_counter()
+                for billing_info in subscribers.order_by('pk')[:options['serial_sample']]:
+                    billing_info.get_update_from_stripe()
+                serial = (time.perf_counter() - start) / options['serial_sample']
+                self.stdout.write('serial: %.1f ms per subscriber, %.0f s estimated for %d' % (
+                    serial * 1000, serial * options['subscribers'], options['subscribers']))
+
+                start = time.perf_counter()
+                summary = reconcile(subscribers, workers=options['workers'], rate=options['rate'],
+                                    batch_size=options['batch_size'])
+                elapsed = time.perf_counter() - start
+                self.stdout.write('pool: %.0f s for %d (%.0f/s), changed: %d, unchanged: %d, failed: %d, '
+                                  'requests: %d' % (
+                                      elapsed, options['subscribers'], options['subscribers'] / elapsed,
+                                      summary['changed'], summary['unchanged'], summary['failed'], server.requests))
+
+                transaction.set_rollback(True)
+        finally:
+            server.shutdown()
+            server.server_close()
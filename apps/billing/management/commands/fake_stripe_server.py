@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from billing.fake_stripe import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = "Serve fake Stripe subscriptions for scan_subscribers --api-base (see billing.fake_stripe)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency', type=float, default=0.05, help='seconds per request')
+        parser.add_argument('--error-rate', type=float, default=0, help='share of requests answered with 429')
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer((options['host'], options['port']),
+                                  latency=options['latency'], error_rate=options['error_rate'])
+        self.stdout.write('Fake Stripe on %s' % server.url)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write('%d requests served' % server.requests)
@@ -1,15 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytz
+import stripe
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db.models import F, Q
 
+from billing.gateway import get_stats
 from billing.models import BillingInfo
+from billing.reconcile import reconcile
+
+
+def get_stale_subscribers(max_age):
+    """
+    :param max_age: seconds since the last Stripe data
+    :return: subscribers whose subscription may have changed without a webhook event
+    """
+    now = datetime.now(tz=pytz.UTC)
+    return BillingInfo.objects.filter(subscription_id__isnull=False).filter(
+        Q(stripe_synced_at__isnull=True) |
+        Q(stripe_synced_at__lt=now - timedelta(seconds=max_age)) |
+        Q(current_period_end__lt=now, stripe_synced_at__lt=F('current_period_end'))  # renewal not seen yet
+    )
 
 
 class Command(BaseCommand):
-    help = "My shiny new management command."
+    help = "Reconcile the subscriptions with Stripe. Webhooks (billing.webhooks) keep them up to date, " \
+           "so only the subscriptions not synced recently or not renewed after their period end are fetched."
 
-    # def add_arguments(self, parser):
-    #     parser.add_argument('sample', nargs='+')
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=settings.STRIPE_RECONCILE_AGE,
+                            help='fetch subscriptions not synced for this many seconds')
+        parser.add_argument('--all', action='store_true', help='fetch every subscription')
+        parser.add_argument('--workers', type=int, default=8, help='concurrent Stripe requests')
+        parser.add_argument('--rate', type=float, default=20, help='Stripe requests per second')
+        parser.add_argument('--batch-size', type=int, default=500, help='rows per UPDATE')
+        parser.add_argument('--retries', type=int, default=4, help='retries of rate limited/failed requests')
+        parser.add_argument('--api-base', help='Stripe API URL, e.g. of fake_stripe_server')
 
     def handle(self, *args, **options):
-        subscribers = BillingInfo.objects.filter(subscription_id__isnull=False)
-        for sb in subscribers:
-            sb.get_update_from_stripe()
+        if options['api_base']:
+            stripe.api_base = options['api_base']
+
+        if options['all']:
+            subscribers = BillingInfo.objects.filter(subscription_id__isnull=False)
+        else:
+            subscribers = get_stale_subscribers(options['max_age'])
+
+        summary = reconcile(subscribers, workers=options['workers'], rate=options['rate'],
+                            batch_size=options['batch_size'], retries=options['retries'])
+
+        self.stdout.write('changed: %(changed)d, unchanged: %(unchanged)d, failed: %(failed)d' % summary)
+        for operation, counters in get_stats().items():
+            self.stdout.write('%s: %d calls, %d errors, %d timeouts, %d rejected, %.0f ms avg, %.0f ms max' % (
+                operation, counters['calls'], counters['errors'], counters['timeouts'], counters['rejected'],
+                counters['latency_total'] / max(counters['calls'], 1) * 1000, counters['latency_max'] * 1000))
@@ -0,0 +1,29 @@
+import stripe
+from django.core.management.base import BaseCommand
+
+from billing.models import BillingInfo
+
+
+class Command(BaseCommand):
+    help = "Fetch the card summary of the customers that never had one or whose default card changed " \
+           "in an event without the card (BillingInfo.card_synced_at is empty). Run it every few minutes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='customers fetched per run')
+        parser.add_argument('--api-base', help='Stripe API URL, e.g. of fake_stripe_server')
+
+    def handle(self, *args, **options):
+        if options['api_base']:
+            stripe.api_base = options['api_base']
+
+        billing_infos = BillingInfo.objects.filter(customer_id__isnull=False, card_synced_at__isnull=True) \
+            .order_by('pk')[:options['limit']]
+
+        synced = failed = 0
+        for billing_info in billing_infos:
+            if billing_info.get_card_from_stripe():
+                synced += 1
+            else:
+                failed += 1  # NOTE: logged by get_card_from_stripe, fetched again by the next run
+
+        self.stdout.write('synced: %d, failed: %d' % (synced, failed))
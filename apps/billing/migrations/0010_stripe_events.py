@@ -0,0 +1,31 @@
+# Generated by Django 2.0.3 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0009_auto_20190130_0832'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('type', models.CharField(max_length=128)),
+                ('created', models.DateTimeField(help_text='Time the event was created in Stripe')),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ('-received_at',),
+            },
+        ),
+        migrations.AddField(
+            model_name='billinginfo',
+            name='stripe_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Time of the Stripe data of the subscription (event or fetch)', null=True),
+        ),
+    ]
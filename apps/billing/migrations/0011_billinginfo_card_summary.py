@@ -0,0 +1,23 @@
+# Generated by Django 2.0.3 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0010_stripe_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billinginfo',
+            name='card_source_id',
+            field=models.CharField(blank=True, editable=False, help_text='Stripe source of the card summary', max_length=256, null=True),
+        ),
+        migrations.AddField(
+            model_name='billinginfo',
+            name='card_synced_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Time of the Stripe data of the card summary (event or fetch)', null=True),
+        ),
+    ]
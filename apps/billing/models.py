@@ -1,12 +1,18 @@
 from django.db import models
 from django.conf import settings
 
-from datetime import datetime
-import stripe
+from datetime import datetime, timedelta
+import logging
 import pytz
+import stripe
+
+from billing.stripe_client import get_stripe_client
+
+logger = logging.getLogger(__name__)
 
-stripe.api_key = settings.STRIPE_PRIVATE_KEY
-stripe.api_version = '2018-02-28'
+# card summary of the default source of the customer, see BillingInfo.apply_card
+CARD_FIELDS = ('card_source_id', 'card_synced_at', 'last4', 'brand', 'exp_month', 'exp_year',
+               'address_line1', 'address_line2', 'postcode', 'city', 'state', 'country')
 
 
 class BillingInfo(models.Model):
@@ -25,6 +31,12 @@ class BillingInfo(models.Model):
     created = models.DateTimeField(null=True, blank=True)
     current_period_start = models.DateTimeField(null=True, blank=True)
     current_period_end = models.DateTimeField(null=True, blank=True)
+    stripe_synced_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                            help_text='Time of the Stripe data of the subscription (event or fetch)')
+    card_source_id = models.CharField(max_length=256, null=True, blank=True, editable=False,
+                                      help_text='Stripe source of the card summary')
+    card_synced_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                          help_text='Time of the Stripe data of the card summary (event or fetch)')
 
     # billing details
     email = models.EmailField(null=True, blank=True)
@@ -49,9 +61,14 @@ class BillingInfo(models.Model):
 
     @property
     def is_active(self):
+        """
+        Answered from the local subscription state, Stripe is never called here.
+        NOTE: after current_period_end the renewal comes from the webhooks or "scan_subscribers", and the last
+        known status is trusted for settings.ENTITLEMENT_MAX_STALE seconds meanwhile.
+        """
         if not self.is_in_curperiod():
-
-            self.get_update_from_stripe()
+            if not self.is_in_stale_period():
+                return False
 
         if self.subscription_status == "active":
             return True
@@ -71,22 +88,123 @@ class BillingInfo(models.Model):
         else:
             return False
 
+    def is_in_stale_period(self):
+        if self.current_period_end is None:
+            return False
+
+        stale_end = self.current_period_end + timedelta(seconds=settings.ENTITLEMENT_MAX_STALE)
+        return datetime.now(tz=pytz.UTC) < stale_end
+
+    def apply_subscription(self, subs_resp, synced_at=None):
+        """
+        :param subs_resp: Stripe subscription object
+        :param synced_at: time of the Stripe data (default: now)
+        """
+        self.stripe_synced_at = synced_at or datetime.now(tz=pytz.UTC)
+        self.subscription_status = subs_resp['status']
+        self.created = datetime.fromtimestamp(subs_resp['created'], tz=pytz.UTC)
+        self.current_period_start = datetime.fromtimestamp(subs_resp['current_period_start'], tz=pytz.UTC)
+        self.current_period_end = datetime.fromtimestamp(subs_resp['current_period_end'], tz=pytz.UTC)
+
+    def apply_card(self, source, synced_at=None):
+        """
+        :param source: Stripe card (source) object, None if the customer has no card
+        :param synced_at: time of the Stripe data (default: now)
+        :return: False if the stored summary is newer
+        """
+        synced_at = synced_at or datetime.now(tz=pytz.UTC)
+        if self.card_synced_at is not None and self.card_synced_at > synced_at:
+            return False
+
+        source = source or {}
+        self.card_source_id = source.get('id')
+        self.card_synced_at = synced_at
+        self.last4 = source.get('last4')
+        self.brand = source.get('brand')
+        self.exp_month = source.get('exp_month')
+        self.exp_year = source.get('exp_year')
+        if source.get('address_line1'):  # NOTE: keep the address of the billing form if the card has none
+            self.address_line1 = source.get('address_line1')
+            self.address_line2 = source.get('address_line2')
+            self.postcode = source.get('address_zip')
+            self.city = source.get('address_city')
+            self.state = source.get('address_state')
+            self.country = source.get('address_country')
+        return True
+
+    def apply_customer(self, customer, synced_at=None):
+        """
+        :param customer: Stripe customer object (with its sources)
+        :return: False if the stored card summary is newer or didn't change
+        """
+        if 'sources' not in customer:
+            # NOTE: e.g. customer.updated events, the card is unknown without the sources: the summary is kept
+            # and marked (card_synced_at None) for "sync_cards" if the default source or the email changed
+            if synced_at is not None and self.card_synced_at is not None and self.card_synced_at > synced_at:
+                return False
+            if customer.get('default_source') != self.card_source_id or \
+                    (customer.get('email') and customer['email'] != self.email):
+                self.card_synced_at = None
+                return True
+            return False
+
+        sources = customer['sources']['data'] if customer.get('sources') else []
+        default = [source for source in sources if source['id'] == customer.get('default_source')]
+        source = (default or sources or [None])[0]
+
+        if customer.get('email'):
+            self.email = customer['email']
+        return self.apply_card(source, synced_at)
+
+    def get_card_from_stripe(self):
+        """
+        Fills the card summary from the customer (see "sync_cards").
+        :return: True if the summary was updated, False if Stripe failed, None without customer
+        """
+        if self.customer_id is None:
+            return None
+        try:
+            customer = get_stripe_client().retrieve_customer(self.customer_id)
+        except stripe.error.StripeError:
+            logger.warning('Could not retrieve customer %s of %s', self.customer_id, self.user_id, exc_info=True)
+            return False
+
+        if self.apply_customer(customer):
+            self.save(update_fields=CARD_FIELDS + ('email', ))
+        return True
+
     def get_update_from_stripe(self):
+        """
+        :return: True if the subscription was updated, False if Stripe failed, None without subscription
+        """
         if self.subscription_id is None:
             return None
         try:
-            subs_resp = stripe.Subscription.retrieve(self.subscription_id)
+            subs_resp = get_stripe_client().retrieve_subscription(self.subscription_id)
+        except stripe.error.StripeError:
+            logger.warning('Could not retrieve subscription %s of %s', self.subscription_id, self.user_id,
+                           exc_info=True)
+            return False
 
-            self.subscription_status = subs_resp['status']
-            self.created = datetime.fromtimestamp(subs_resp['created'], tz=pytz.UTC)
-            self.current_period_start = datetime.fromtimestamp(subs_resp['current_period_start'], tz=pytz.UTC)
-            self.current_period_end = datetime.fromtimestamp(subs_resp['current_period_end'], tz=pytz.UTC)
+        self.apply_subscription(subs_resp)
+        self.save()
+        return True
 
-            self.save()
 
-        except Exception as retrieve_subs_exception:
-            print(retrieve_subs_exception, "==============================", str(retrieve_subs_exception))
-            pass
+class StripeEvent(models.Model):
+    """
+    Stripe webhook events already applied (see billing.webhooks), so a redelivered event is ignored.
+    """
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=128)
+    created = models.DateTimeField(help_text='Time the event was created in Stripe')
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-received_at', )
+
+    def __str__(self):
+        return '%s (%s)' % (self.type, self.event_id)
 
 
 class StripeInfo(models.Model):
@@ -101,17 +219,16 @@ class StripeInfo(models.Model):
 
     @classmethod
     def get_subscription_price(cls):
-        try:
-            return cls.objects.first().subscription_price
-        except Exception as e:
-            return None
+        """
+        NOTE: from the in-process copy (billing.pricing), no query unless StripeInfo changed
+        """
+        from billing.pricing import get_pricing  # billing.pricing imports this module
+        return get_pricing().subscription_price
 
     @classmethod
     def get_plan_id(cls):
-        try:
-            return cls.objects.first().plan_id
-        except Exception as e:
-            return None
+        from billing.pricing import get_pricing
+        return get_pricing().plan_id
 
     def save(self):
         if StripeInfo.objects.count() > 0:
@@ -0,0 +1,70 @@
+"""
+In-process copy of the StripeInfo singleton and of the /api/v1/pricing/ response.
+
+StripeInfo is only edited through the admin, so every worker loads it once, with
+the pricing response already serialized and its ETag. Saving or deleting it bumps
+a shared version counter (same scheme as constant.registry), and each worker
+reloads the next time it sees a newer version.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+
+from core.cache import SharedVersion
+from billing.models import StripeInfo
+
+
+pricing_version = SharedVersion('billing:pricing:version', max_age=1)
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class PricingSnapshot(object):
+    """
+    StripeInfo values and the serialized pricing response, tagged with the version they were loaded at.
+    """
+
+    def __init__(self, version):
+        self.version = version
+
+        stripe_info = StripeInfo.objects.first()
+        self.subscription_price = stripe_info.subscription_price if stripe_info else None
+        self.plan_id = stripe_info.plan_id if stripe_info else None
+
+        self.body = json.dumps(OrderedDict([
+            ("public_key", settings.STRIPE_PUBLIC_KEY),
+            ("subs_fee", str(self.subscription_price))]), separators=(',', ':')).encode()
+        self.etag = '"%s"' % hashlib.md5(self.body).hexdigest()
+
+
+def get_pricing():
+    """
+    :return: PricingSnapshot for the current version (loads it if this worker is stale)
+    """
+    global _snapshot
+
+    version = pricing_version.get()
+    snapshot = _snapshot
+
+    if snapshot is None or snapshot.version != version:
+        with _lock:
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = PricingSnapshot(version)
+            snapshot = _snapshot
+
+    return snapshot
+
+
+def invalidate_pricing(sender, **kwargs):
+    # NOTE: bumped in the transaction of the change, other workers see the new version with the new row
+    pricing_version.bump()
+
+
+def connect_signals():
+    post_save.connect(invalidate_pricing, sender=StripeInfo, dispatch_uid='pricing_save')
+    post_delete.connect(invalidate_pricing, sender=StripeInfo, dispatch_uid='pricing_delete')
@@ -0,0 +1,151 @@
+"""
+Reconciliation of BillingInfo rows with Stripe (see "scan_subscribers").
+
+Subscriptions are fetched by a bounded thread pool. The workers share a token
+bucket, so the command stays under the Stripe rate limit, and rate limit or
+connection errors are retried with exponential backoff. Every batch of rows is
+written back with one UPDATE for the changed rows and one for the unchanged ones.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import itertools
+import logging
+import random
+import threading
+import time
+
+import pytz
+import stripe
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, When, Value, Q
+
+from billing.entitlements import entitlement_key
+from billing.gateway import StripeUnavailable
+from billing.models import BillingInfo
+from billing.stripe_client import get_stripe_client
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_ERRORS = (stripe.error.RateLimitError, stripe.error.APIConnectionError, stripe.error.APIError)
+SYNC_FIELDS = ('subscription_status', 'created', 'current_period_start', 'current_period_end')
+
+
+class TokenBucket(object):
+    """
+    Thread safe rate limit: :param rate: tokens per second, up to :param capacity: at once.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def retrieve_subscription(client, subscription_id, bucket, retries, backoff):
+    """
+    :return: the Stripe subscription, retried on RETRYABLE_ERRORS with exponential backoff and jitter
+    """
+    for attempt in itertools.count():
+        bucket.acquire()
+        try:
+            return client.retrieve_subscription(subscription_id)
+        except StripeUnavailable:  # circuit breaker open, fail fast
+            raise
+        except RETRYABLE_ERRORS:
+            if attempt >= retries:
+                raise
+            time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def write_batch(changed, unchanged, synced_at):
+    """
+    :param changed: BillingInfo objects with new values of SYNC_FIELDS
+    :param unchanged: ids of the BillingInfo rows checked without change
+    NOTE: rows synced by a webhook event after param:synced_at are not overwritten
+    """
+    not_newer = Q(stripe_synced_at__isnull=True) | Q(stripe_synced_at__lte=synced_at)
+
+    with transaction.atomic():
+        if changed:
+            # NOTE: Django 2.0 has no bulk_update, this is the same CASE WHEN statement
+            updates = {
+                field: Case(*[When(pk=billing_info.pk, then=Value(getattr(billing_info, field)))
+                              for billing_info in changed],
+                            output_field=BillingInfo._meta.get_field(field))
+                for field in SYNC_FIELDS
+            }
+            BillingInfo.objects.filter(not_newer, pk__in=[billing_info.pk for billing_info in changed]) \
+                .update(stripe_synced_at=synced_at, **updates)
+
+            # NOTE: update() sends no post_save, so the cached entitlements are dropped here
+            keys = [entitlement_key(billing_info.user_id) for billing_info in changed]
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+        if unchanged:
+            BillingInfo.objects.filter(not_newer, pk__in=unchanged).update(stripe_synced_at=synced_at)
+
+
+def reconcile(subscribers, client=None, workers=8, rate=20, batch_size=500, retries=4, backoff=0.5):
+    """
+    :param subscribers: BillingInfo queryset
+    :param rate: Stripe requests per second, for all the workers
+    :return: Counter of 'changed', 'unchanged' and 'failed' rows
+    """
+    client = client or get_stripe_client()
+    bucket = TokenBucket(rate)
+    summary = Counter(changed=0, unchanged=0, failed=0)
+
+    def fetch(billing_info):
+        try:
+            return billing_info, retrieve_subscription(client, billing_info.subscription_id, bucket, retries, backoff)
+        except stripe.error.StripeError as e:
+            logger.warning('Could not retrieve subscription %s of %s: %s',
+                           billing_info.subscription_id, billing_info.user_id, e)
+            return billing_info, None
+
+    rows = subscribers.filter(subscription_id__isnull=False) \
+        .only('pk', 'user_id', 'subscription_id', *SYNC_FIELDS).iterator()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+
+            synced_at = datetime.now(tz=pytz.UTC)
+            changed, unchanged = [], []
+            for billing_info, subscription in executor.map(fetch, batch):
+                if subscription is None:
+                    summary['failed'] += 1
+                    continue
+
+                before = [getattr(billing_info, field) for field in SYNC_FIELDS]
+                billing_info.apply_subscription(subscription, synced_at=synced_at)
+                if before == [getattr(billing_info, field) for field in SYNC_FIELDS]:
+                    unchanged.append(billing_info.pk)
+                else:
+                    changed.append(billing_info)
+
+            write_batch(changed, unchanged, synced_at)
+            summary['changed'] += len(changed)
+            summary['unchanged'] += len(unchanged)
+
+    return summary
@@ -0,0 +1,107 @@
+"""
+Stripe API clients.
+
+The code calls Stripe through get_stripe_client(), so the real API can be swapped
+for the in-memory FakeStripeClient in tests and benchmarks (settings.STRIPE_CLIENT).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+import stripe
+
+from billing import gateway
+
+_client = None
+_lock = threading.Lock()
+
+
+class StripeClient(object):
+    """
+    Calls the Stripe API with the stripe package, through billing.gateway.
+    """
+
+    def retrieve_subscription(self, subscription_id):
+        return gateway.call('subscription.retrieve', stripe.Subscription.retrieve, subscription_id)
+
+    def retrieve_customer(self, customer_id):
+        return gateway.call('customer.retrieve', stripe.Customer.retrieve, customer_id)
+
+
+class FakeStripeClient(object):
+    """
+    In-memory Stripe, with an optional latency per call (seconds).
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.subscriptions = {}
+        self.customers = {}
+        self.calls = 0
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def add_subscription(self, subscription_id, status='active', created=None, period_days=30, **extra):
+        now = int(time.time())
+        created = created or now
+        self.subscriptions[subscription_id] = dict({
+            'id': subscription_id,
+            'object': 'subscription',
+            'status': status,
+            'created': created,
+            'current_period_start': now,
+            'current_period_end': now + period_days * 86400,
+        }, **extra)
+        return self.subscriptions[subscription_id]
+
+    def add_customer(self, customer_id, email=None, last4='4242', brand='Visa', **extra):
+        card = {'id': 'card_%s' % customer_id, 'object': 'card', 'last4': last4, 'brand': brand,
+                'exp_month': 12, 'exp_year': 2030}
+        self.customers[customer_id] = dict({
+            'id': customer_id,
+            'object': 'customer',
+            'email': email,
+            'default_source': card['id'],
+            'sources': {'object': 'list', 'data': [card]},
+        }, **extra)
+        return self.customers[customer_id]
+
+    def retrieve_subscription(self, subscription_id):
+        self._call()
+        try:
+            return self.subscriptions[subscription_id]
+        except KeyError:
+            raise stripe.error.InvalidRequestError('No such subscription: %s' % subscription_id, 'id')
+
+    def retrieve_customer(self, customer_id):
+        self._call()
+        try:
+            return self.customers[customer_id]
+        except KeyError:
+            raise stripe.error.InvalidRequestError('No such customer: %s' % customer_id, 'id')
+
+
+def get_stripe_client():
+    """
+    :return: shared instance of settings.STRIPE_CLIENT
+    """
+    global _client
+
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = import_string(settings.STRIPE_CLIENT)()
+    return _client
+
+
+def set_stripe_client(client):
+    """
+    Replaces the shared client (e.g. with a configured FakeStripeClient in a benchmark).
+    """
+    global _client
+    _client = client
@@ -1,8 +1,9 @@
 from django.urls import path
 
-from .views import BillingInfo
+from .views import BillingInfo, stripe_webhook
 
 
 urlpatterns = [
     path('billing_info/<int:pk>/', BillingInfo.as_view(), name='billing_info'),
+    path('webhook/stripe/', stripe_webhook, name='stripe_webhook'),
 ]
@@ -1,15 +1,13 @@
-from django.conf import settings
-
 import stripe
 
-stripe.api_key = settings.STRIPE_PRIVATE_KEY
-stripe.api_version = '2018-10-31'
+from billing import gateway
 
 
 def create_charge(user_email, amount, token):
 
     try:
-        resp = stripe.Charge.create(
+        resp = gateway.call(
+            'charge.create', stripe.Charge.create,
             amount=int(amount*100),  # NOTE: amount: $1.99
             currency="usd",
             source=token,
@@ -29,7 +27,8 @@ def create_charge(user_email, amount, token):
 
 def create_customer(user_email, token):
     try:
-        resp = stripe.Customer.create(
+        resp = gateway.call(
+            'customer.create', stripe.Customer.create,
             source=token,
             description="Customer for %s" % user_email
         )
@@ -51,7 +50,8 @@ def create_customer(user_email, token):
 def create_subscription(customer, plan):
 
     try:
-        resp = stripe.Subscription.create(
+        resp = gateway.call(
+            'subscription.create', stripe.Subscription.create,
             customer=customer,
             items=[
                 {
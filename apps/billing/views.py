@@ -1,20 +1,23 @@
-import datetime
-import pytz
+import logging
 
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.views.generic import CreateView
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.shortcuts import get_object_or_404, redirect
 
 from core.mixins import PaywallMixin
+from billing import gateway
 from billing.forms import BillingForm
 from billing.models import StripeInfo
+from billing.webhooks import handle_event
 
 import stripe
 
-stripe.api_key = settings.STRIPE_PRIVATE_KEY
-stripe.api_version = '2018-10-31'
+logger = logging.getLogger(__name__)
 
 
 class BillingInfo(PaywallMixin, CreateView):
@@ -36,28 +39,7 @@ class BillingInfo(PaywallMixin, CreateView):
 
         context['stripe_api_key'] = settings.STRIPE_PUBLIC_KEY
 
-        # get customer info from stripe
-        if self.billing_info and self.billing_info.brand is None:
-            try:
-                customer_resp = stripe.Customer.retrieve(self.billing_info.customer_id)
-
-                self.billing_info.email = customer_resp.email
-                self.billing_info.last4 = customer_resp.sources.data[0]['last4']
-                self.billing_info.brand = customer_resp.sources.data[0]['brand']
-                self.billing_info.exp_month = customer_resp.sources.data[0]['exp_month']
-                self.billing_info.exp_year = customer_resp.sources.data[0]['exp_year']
-                self.billing_info.city = customer_resp.sources.data[0]['address_city']
-                self.billing_info.state = customer_resp.sources.data[0]['address_state']
-                self.billing_info.country = customer_resp.sources.data[0]['address_country']
-                self.billing_info.address_line1 = customer_resp.sources.data[0]['address_line1']
-                self.billing_info.address_line2 = customer_resp.sources.data[0]['address_line2']
-                self.billing_info.post_code = customer_resp.sources.data[0]['address_zip']
-                self.billing_info.save()
-
-                context['billing_info'] = self.billing_info
-            except Exception:
-                pass
-
+        # NOTE: the card summary is kept up to date by the webhooks and "sync_cards", this page renders what is stored
         return context
 
     def form_valid(self, form):
@@ -70,14 +52,17 @@ class BillingInfo(PaywallMixin, CreateView):
             email = form.cleaned_data.get('email')
 
             # create customer
-            cus_resp = stripe.Customer.create(
+            cus_resp = gateway.call(
+                'customer.create', stripe.Customer.create,
                 source=stripe_token,
                 email=email
             )
 
             billing_obj.customer_id = cus_resp['id']
+            billing_obj.apply_customer(cus_resp)
 
-            subs_resp = stripe.Subscription.create(
+            subs_resp = gateway.call(
+                'subscription.create', stripe.Subscription.create,
                 customer=billing_obj.customer_id,
                 items=[
                     {
@@ -87,12 +72,7 @@ class BillingInfo(PaywallMixin, CreateView):
             )
 
             billing_obj.subscription_id = subs_resp['id']
-            billing_obj.subscription_status = subs_resp['status']
-            billing_obj.created = datetime.datetime.fromtimestamp(subs_resp['created'], tz=pytz.UTC)
-            billing_obj.current_period_start = datetime.datetime.fromtimestamp(subs_resp['current_period_start'],
-                                                                               tz=pytz.UTC)
-            billing_obj.current_period_end = datetime.datetime.fromtimestamp(subs_resp['current_period_end'],
-                                                                             tz=pytz.UTC)
+            billing_obj.apply_subscription(subs_resp)
 
             billing_obj.user = self.request.user
             billing_obj.save()
@@ -101,3 +81,21 @@ class BillingInfo(PaywallMixin, CreateView):
             messages.error(self.request, str(e))
 
         return redirect(self.get_success_url())
+
+
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    """
+    Endpoint of the Stripe webhook (subscription and invoice events), signed with settings.STRIPE_WEBHOOK_SECRET.
+    """
+    try:
+        event = stripe.Webhook.construct_event(
+            request.body, request.META.get('HTTP_STRIPE_SIGNATURE', ''), settings.STRIPE_WEBHOOK_SECRET)
+    except (ValueError, stripe.error.SignatureVerificationError) as e:
+        logger.warning('Rejected Stripe webhook: %s', e)
+        return HttpResponseBadRequest()
+
+    # NOTE: 200 for a redelivered event too, otherwise Stripe keeps retrying it
+    handle_event(event)
+    return HttpResponse()
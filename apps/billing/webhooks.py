@@ -0,0 +1,110 @@
+"""
+Stripe webhook events applied to BillingInfo: the subscription, its period and the card summary.
+
+Every event is applied once: its id is stored in StripeEvent in the same transaction
+as the update. Events older than the data already stored on the BillingInfo (e.g.
+delivered out of order) are recorded but not applied.
+"""
+from datetime import datetime
+import logging
+
+import pytz
+from django.db import transaction, IntegrityError
+
+from billing.models import BillingInfo, StripeEvent, CARD_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+def event_time(event):
+    return datetime.fromtimestamp(event['created'], tz=pytz.UTC)
+
+
+def is_newer(billing_info, created):
+    return billing_info.stripe_synced_at is None or billing_info.stripe_synced_at <= created
+
+
+def apply_subscription_event(event, created):
+    subscription = event['data']['object']
+
+    for billing_info in BillingInfo.objects.select_for_update().filter(subscription_id=subscription['id']):
+        if is_newer(billing_info, created):
+            billing_info.apply_subscription(subscription, synced_at=created)
+            billing_info.save()
+
+
+def apply_invoice_event(event, created):
+    invoice = event['data']['object']
+    if not invoice.get('subscription'):
+        return
+
+    for billing_info in BillingInfo.objects.select_for_update().filter(subscription_id=invoice['subscription']):
+        if not is_newer(billing_info, created):
+            continue
+
+        if event['type'] in ('invoice.payment_succeeded', 'invoice.paid'):
+            # the subscription line holds the period that was paid
+            for line in invoice['lines']['data']:
+                if line.get('type') == 'subscription' and line.get('period'):
+                    billing_info.current_period_start = datetime.fromtimestamp(line['period']['start'], tz=pytz.UTC)
+                    billing_info.current_period_end = datetime.fromtimestamp(line['period']['end'], tz=pytz.UTC)
+                    break
+        elif event['type'] == 'invoice.payment_failed':
+            billing_info.subscription_status = 'past_due'
+        else:
+            continue
+
+        billing_info.stripe_synced_at = created
+        billing_info.save()
+
+
+def apply_customer_event(event, created):
+    """
+    customer.updated (e.g. new default source) and customer.source.* events update the card summary.
+    """
+    obj = event['data']['object']
+    customer_id = obj['id'] if event['type'] == 'customer.updated' else obj.get('customer')
+    if not customer_id:
+        return
+
+    for billing_info in BillingInfo.objects.select_for_update().filter(customer_id=customer_id):
+        if event['type'] == 'customer.updated':
+            applied = billing_info.apply_customer(obj, synced_at=created)
+        elif obj['id'] != billing_info.card_source_id:
+            continue  # NOTE: not the default card, customer.updated follows if it becomes the default
+        elif event['type'] == 'customer.source.deleted':
+            applied = billing_info.apply_card(None, synced_at=created)
+        else:
+            applied = billing_info.apply_card(obj, synced_at=created)
+
+        if applied:
+            billing_info.save(update_fields=CARD_FIELDS + ('email', ))
+
+
+def handle_event(event):
+    """
+    :param event: verified Stripe event
+    :return: False if the event was already applied
+    """
+    created = event_time(event)
+
+    if StripeEvent.objects.filter(event_id=event['id']).exists():
+        return False
+
+    try:
+        with transaction.atomic():
+            StripeEvent.objects.create(event_id=event['id'], type=event['type'], created=created)
+
+            if event['type'].startswith('customer.subscription.'):
+                apply_subscription_event(event, created)
+            elif event['type'].startswith('invoice.'):
+                apply_invoice_event(event, created)
+            elif event['type'] == 'customer.updated' or event['type'].startswith('customer.source.'):
+                apply_customer_event(event, created)
+            else:
+                logger.info('Ignored Stripe event %s (%s)', event['id'], event['type'])
+
+    except IntegrityError:  # delivered twice at the same time
+        return False
+
+    return True
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ConstantConfig(AppConfig):
     name = 'constant'
+
+    def ready(self):
+        from constant.registry import connect_signals
+        connect_signals()
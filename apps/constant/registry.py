@@ -0,0 +1,136 @@
+"""
+In-process registry of the constant tables.
+
+The constant tables are only edited through the admin, so every worker loads
+them once and keeps the rows in memory. Saving or deleting any constant row
+bumps a shared version counter, and each worker reloads its snapshot the next
+time it sees a newer version.
+"""
+import threading
+
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete
+
+from core.cache import SharedVersion
+from constant.models import AimValueRange, TrajectoryValueRange, ShotImage, DistanceDiffRange, AimDiffRange, \
+    TrajectoryDiffRange, YardBucket, FeetBucket, ClubType, PuttingAimRange, PuttingDistRange
+
+
+# NOTE: the counter is read at most once a second per worker, not on every get_constants() call
+constant_version = SharedVersion('constant:version', max_age=1)
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class ConstantSnapshot(object):
+    """
+    Immutable copy of every constant table, tagged with the version it was loaded at.
+    """
+
+    def __init__(self, version):
+        self.version = version
+
+        # buckets
+        self.yard_buckets = tuple(YardBucket.objects.all())
+        self.feet_buckets = tuple(FeetBucket.objects.all())
+
+        # values
+        self.aim_values = tuple(AimValueRange.objects.all())
+        self.trajectories = tuple(TrajectoryValueRange.objects.all())
+        self.shot_images = {image.name: image for image in ShotImage.objects.all()}
+
+        # diff ranges
+        self.distance_diffs = tuple(DistanceDiffRange.objects.all())
+        self.aim_diffs = tuple(AimDiffRange.objects.all())
+        self.trajectory_diffs = tuple(TrajectoryDiffRange.objects.all())
+        self.putting_aims = tuple(PuttingAimRange.objects.all())
+        self.putting_dists = tuple(PuttingDistRange.objects.all())
+
+        self.club_types = tuple(ClubType.objects.all())
+
+        # lookups
+        self._aims_by_description = {aim.description: aim for aim in self.aim_values}
+        self._trajectories_by_type = {}
+        for traj in self.trajectories:
+            self._trajectories_by_type.setdefault(traj.type, []).append(traj)
+
+        # case-folded descriptions for report validation (same as description__iexact)
+        self.valid_aims = frozenset(aim.description.casefold() for aim in self.aim_values)
+        self.valid_trajectories = frozenset(traj.description.casefold() for traj in self.trajectories)
+
+    def get_trajectories(self, traj_type):
+        """
+        :param traj_type: long, putting, chip or pitch
+        :return: list of trajectories of that type
+        """
+        return self._trajectories_by_type.get(traj_type, [])
+
+    def get_trajectory(self, description, traj_type='long'):
+        for traj in self.get_trajectories(traj_type):
+            if traj.description == description:
+                return traj
+        return None
+
+    def is_valid_aim(self, description):
+        return description is not None and description.casefold() in self.valid_aims
+
+    def is_valid_trajectory(self, description):
+        return description is not None and description.casefold() in self.valid_trajectories
+
+    def get_aim(self, description):
+        return self._aims_by_description.get(description)
+
+    def get_shape(self, aim):
+        """
+        :param aim: AimValueRange object
+        :return: ShotImage for the aim (draw/straight/fade) or None
+        """
+        if aim.is_draw:
+            name = 'draw'
+        elif aim.is_straight:
+            name = 'straight'
+        elif aim.is_fade:
+            name = 'fade'
+        else:
+            return None
+
+        return self.shot_images.get(name)
+
+    def get_yard_bucket(self, distance):
+        """
+        :return: yard bucket which contains the param:distance (same as YardBucket.get_bucket_obj)
+        """
+        for bucket in self.yard_buckets:
+            if bucket.is_in_bucket(distance):
+                return bucket
+        return None
+
+
+def get_constants():
+    """
+    :return: ConstantSnapshot for the current version (loads it if this worker is stale)
+    """
+    global _snapshot
+
+    version = constant_version.get()
+    snapshot = _snapshot
+
+    if snapshot is None or snapshot.version != version:
+        with _lock:
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = ConstantSnapshot(version)
+            snapshot = _snapshot
+
+    return snapshot
+
+
+def invalidate_constants(sender, **kwargs):
+    # NOTE: bumped in the transaction of the change, other workers see the new version with the new rows
+    constant_version.bump()
+
+
+def connect_signals():
+    for model in apps.get_app_config('constant').get_models():
+        post_save.connect(invalidate_constants, sender=model, dispatch_uid='constant_registry_save_%s' % model.__name__)
+        post_delete.connect(invalidate_constants, sender=model, dispatch_uid='constant_registry_delete_%s' % model.__name__)
@@ -0,0 +1,234 @@
+"""
+Aggregations of the delta shots for the report charts ("filter_by_daterange").
+
+Every chart is the mean of a shot field per group and day, returned as nested
+dicts: {group: {day: mean}} or {group1: {group2: {day: mean}}}.
+
+The "sql" engine runs one grouped AVG query per chart, so memory and time depend on
+the number of (group, day) pairs, not on the number of shots. The "pandas" engine
+loads the shots into a DataFrame, and the "stream" engine reads them through a
+server-side cursor and folds every chunk into running sums and counts, so its memory
+is bounded by the chunk size and the number of groups (settings.ANALYTICS_ENGINE
+selects the engine).
+"""
+import datetime
+import itertools
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Avg, Min, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import DeltaShotReport, PRACTICE_TYPES
+from core.utils import groupby2dict
+
+
+CLUB_PRACTICE_TYPES = [PRACTICE_TYPES.random, PRACTICE_TYPES.block, PRACTICE_TYPES.serial,
+                       PRACTICE_TYPES.custom, PRACTICE_TYPES.warmup,
+                       PRACTICE_TYPES.chip, PRACTICE_TYPES.pitch]
+PUTTING_PRACTICE_TYPES = [PRACTICE_TYPES.random_putting, PRACTICE_TYPES.standard_putting, PRACTICE_TYPES.custom_putting]
+
+# (name in the response, group fields, averaged field), the day is always the last level
+CLUB_CHARTS = (
+    ('hit_acc', ('club', ), 'hit'),
+    ('avg_dist', ('club', ), 'distance'),
+    ('dist_acc', ('club', ), 'distance_accuracy'),
+    ('aim_acc', ('aim', 'club'), 'aim_accuracy'),
+    ('traj_acc', ('trajectory', 'club'), 'trajectory_accuracy'),
+)
+PUTTING_CHARTS = (
+    ('put_hit', ('distance', ), 'hit'),
+    ('put_left', ('distance', ), 'is_left'),
+    ('put_right', ('distance', ), 'is_right'),
+    ('put_short', ('distance', ), 'is_short'),
+    ('put_long', ('distance', ), 'is_long'),
+)
+
+DAY_FORMAT = '%Y-%m-%d'
+ACCURACY_FIELDS = ('distance_accuracy', 'aim_accuracy', 'trajectory_accuracy')
+FLAG_FIELDS = ('hit', 'is_left', 'is_right', 'is_short', 'is_long')
+CATEGORY_FIELDS = ('club', 'aim', 'trajectory')
+STREAM_CHUNK_SIZE = 5000
+
+
+def get_delta_shots(user, start, end):
+    return DeltaShotReport.objects.filter(
+        practice__user=user,
+        reported_at__range=[start, end]).exclude(delta__isnull=True)
+
+
+def get_date_range(shots):
+    """
+    :return: every day (UTC) from the first to the last shot
+    """
+    bounds = shots.aggregate(first=Min('reported_at'), last=Max('reported_at'))
+    if bounds['first'] is None:
+        return []
+
+    day = bounds['first'].date()
+    last = bounds['last'].date()
+    step = datetime.timedelta(days=1)
+
+    date_range = []
+    while day <= last:
+        date_range.append(day.strftime(DAY_FORMAT))
+        day += step
+    return date_range
+
+
+def average_by_day(shots, keys, field):
+    """
+    :return: mean of the field per keys and day, as nested dicts
+    NOTE: like pandas groupby, shots with a NULL key are left out
+    """
+    rows = shots.filter(**{'%s__isnull' % key: False for key in keys}) \
+        .annotate(day=TruncDate('reported_at')) \
+        .values(*keys, 'day') \
+        .annotate(value=Avg(field)) \
+        .order_by(*keys, 'day')  # NOTE: replaces the default ordering, which would be added to GROUP BY
+
+    result = {}
+    for row in rows:
+        node = result
+        for key in keys:
+            node = node.setdefault(row[key], {})
+        node[row['day'].strftime(DAY_FORMAT)] = row['value']
+    return result
+
+
+def sql_charts(shots, charts):
+    with timezone.override(timezone.utc):  # days in UTC, same as the date range
+        return {name: average_by_day(shots, keys, field) for name, keys, field in charts}
+
+
+def chart_columns(charts):
+    """
+    :return: shot fields needed by the charts, 'reported_at' first
+    """
+    fields = {field for _, keys, field in charts} | {key for _, keys, _ in charts for key in keys}
+    return ['reported_at'] + sorted(fields)
+
+
+def build_frame(records, columns, categorical=True):
+    """
+    :param records: tuples of param:columns (e.g. values_list rows)
+    :param categorical: store the days and club/aim/trajectory as categoricals
+    :return: DataFrame with compact dtypes and 'reported_at' replaced by the day (YYYY-MM-DD)
+    """
+    df = pd.DataFrame.from_records(records, columns=columns)
+    if df.empty:
+        return df
+
+    # days are formatted once per distinct day, not once per shot
+    days = pd.to_datetime(df['reported_at'], utc=True).dt.floor('D')
+    codes, uniques = pd.factorize(days, sort=True)
+    day_names = np.asarray(uniques.strftime(DAY_FORMAT), dtype=object)
+    df['reported_at'] = pd.Categorical.from_codes(codes, categories=day_names) if categorical else day_names[codes]
+
+    for column in df.columns:
+        if column in CATEGORY_FIELDS and categorical:
+            df[column] = df[column].astype('category')
+        elif column in FLAG_FIELDS:
+            df[column] = df[column].fillna(0).astype(np.int8)  # NOTE: direction flags are nullable columns
+        elif column in ACCURACY_FIELDS:
+            df[column] = df[column].astype(float)  # NULL (not reported) -> NaN, skipped by mean
+    return df
+
+
+def group_frame(df, keys, field):
+    # NOTE: observed=True, otherwise categorical keys group by every combination of categories
+    return df.groupby(list(keys) + ['reported_at'], observed=True)[field]
+
+
+def frame_charts(records, columns, charts):
+    """
+    :param records: shots as tuples of chart_columns(charts)
+    """
+    df = build_frame(records, columns)
+    if df.empty:
+        return {name: {} for name, _, _ in charts}
+
+    return {
+        # NOTE: observed=True keeps the groups in order of appearance, sorted like the SQL charts and fold_rows
+        name: groupby2dict(group_frame(df, keys, field).agg(['mean']).sort_index())
+        for name, keys, field in charts
+    }
+
+
+def iter_chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def fold_rows(rows, columns, charts, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    :param rows: iterable of tuples of param:columns
+    :return: same as frame_charts, from the sums and counts of every chunk
+    """
+    totals = dict.fromkeys(name for name, _, _ in charts)
+
+    for chunk in iter_chunks(rows, chunk_size):
+        # NOTE: not categorical, the totals of chunks with different categories are added together
+        df = build_frame(chunk, columns, categorical=False)
+        for name, keys, field in charts:
+            grouped = group_frame(df, keys, field).agg(['sum', 'count'])
+            totals[name] = grouped if totals[name] is None else totals[name].add(grouped, fill_value=0)
+
+    result = {}
+    for name, chart_totals in totals.items():
+        if chart_totals is None or chart_totals.empty:
+            result[name] = {}
+        else:
+            means = (chart_totals['sum'] / chart_totals['count']).to_frame('mean')  # count 0 -> NaN
+            result[name] = groupby2dict(means.sort_index())
+    return result
+
+
+def pandas_charts(shots, charts):
+    columns = chart_columns(charts)
+    return frame_charts(list(shots.values_list(*columns)), columns, charts)
+
+
+def stream_charts(shots, charts):
+    columns = chart_columns(charts)
+    rows = shots.order_by().values_list(*columns).iterator(chunk_size=STREAM_CHUNK_SIZE)
+    return fold_rows(rows, columns, charts)
+
+
+ENGINES = {
+    'sql': sql_charts,
+    'pandas': pandas_charts,
+    'stream': stream_charts,
+}
+
+
+def get_report_charts(user, start, end, engine=None):
+    """
+    :param start: first datetime of the range
+    :param end: last datetime of the range
+    :param engine: key of ENGINES (default: settings.ANALYTICS_ENGINE)
+    :return: data of the report charts, None if there is no shot in the range
+    """
+    delta_shots = get_delta_shots(user, start, end)
+    if not delta_shots.exists():
+        return None
+
+    aggregate = ENGINES[engine or settings.ANALYTICS_ENGINE]
+    club_shots = delta_shots.filter(practice__practice_type__in=CLUB_PRACTICE_TYPES)
+    putting_shots = delta_shots.filter(practice__practice_type__in=PUTTING_PRACTICE_TYPES)
+
+    data = {
+        'club_date_range': get_date_range(club_shots),
+        'put_date_range': get_date_range(putting_shots),
+        'feet_range': list(putting_shots.order_by('distance').values_list('distance', flat=True).distinct()),
+    }
+    data.update(aggregate(club_shots, CLUB_CHARTS))
+    data.update(aggregate(putting_shots, PUTTING_CHARTS))
+
+    return data
@@ -0,0 +1,39 @@
+"""
+Distance bitmaps: bit N is set when distance N is in the set.
+"""
+import numpy as np
+
+# NOTE: the bitmap grows with the largest distance, longer (invalid) distances are never stored
+MAX_DISTANCE = 1000
+
+
+def decode_distances(bitmap):
+    """
+    :param bitmap: bytes (or memoryview from the database)
+    :return: sorted list of distances in the bitmap
+    """
+    if not bitmap:
+        return []
+    bits = np.unpackbits(np.frombuffer(bytes(bitmap), dtype=np.uint8))
+    return np.flatnonzero(bits).tolist()
+
+
+def add_distances(bitmap, distances):
+    """
+    :param bitmap: existing bitmap (bytes, memoryview or None)
+    :param distances: distances to add, the ones outside 0..MAX_DISTANCE are skipped
+    :return: new bitmap (bytes)
+    """
+    bitmap = bytes(bitmap or b'')
+    distances = np.asarray(list(distances), dtype=np.int64)
+    distances = distances[(distances >= 0) & (distances <= MAX_DISTANCE)]
+    if not len(distances):
+        return bitmap
+
+    bits = np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8))
+    size = (int(distances.max()) // 8 + 1) * 8
+    if size > len(bits):
+        bits = np.concatenate((bits, np.zeros(size - len(bits), dtype=np.uint8)))
+    bits[distances] = 1
+
+    return np.packbits(bits).tobytes()
@@ -0,0 +1,51 @@
+import time
+
+from django.db import transaction, IntegrityError
+from django.db.models import F
+
+from core.models import SharedVersionCounter
+
+
+class SharedVersion(object):
+    """
+    Version counter stored in the database (core.models.SharedVersionCounter).
+
+    Workers keep in-process copies of slow-changing data and compare the
+    version they loaded against this counter to know when to reload.
+    """
+
+    def __init__(self, key, max_age=0):
+        """
+        :param max_age: seconds the last read version is reused before reading the counter again
+        """
+        self.key = key
+        self.max_age = max_age
+        self._version = None
+        self._read_at = 0
+
+    def get(self):
+        """
+        :return: current version, 0 if it was never bumped
+        """
+        if self._version is not None and time.monotonic() - self._read_at < self.max_age:
+            return self._version
+
+        version = SharedVersionCounter.objects.filter(key=self.key).values_list('value', flat=True).first() or 0
+        self._version, self._read_at = version, time.monotonic()
+        return version
+
+    def bump(self):
+        """
+        Increments the counter in the current transaction, so other workers see the new
+        version exactly when they can see the data that changed.
+        """
+        counters = SharedVersionCounter.objects.filter(key=self.key)
+        with transaction.atomic():
+            if not counters.update(value=F('value') + 1):
+                try:
+                    with transaction.atomic():
+                        SharedVersionCounter.objects.create(key=self.key, value=1)
+                except IntegrityError:  # created by a concurrent bump
+                    counters.update(value=F('value') + 1)
+
+        self._version = None
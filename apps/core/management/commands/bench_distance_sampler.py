@@ -0,0 +1,52 @@
+import random
+import timeit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from constant.models import YardBucket, FeetBucket
+from core.samplers import SAMPLERS
+
+
+def make_buckets(model, bounds, percent):
+    return [model(pk=i + 1, min=low, max=high, percent=percent) for i, (low, high) in enumerate(bounds)]
+
+
+class Command(BaseCommand):
+    help = "Compare the set-based and NumPy distance samplers (no database required)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=2000, help='calls per measurement')
+        parser.add_argument('--used', type=int, nargs='+', default=[0, 50, 500],
+                            help='number of already used distances in the practice')
+        parser.add_argument('--buckets', type=int, default=12, help='number of yard buckets')
+
+    def handle(self, *args, **options):
+        number = options['number']
+
+        yard_buckets = make_buckets(
+            YardBucket, [(75 + i * 25, 99 + i * 25) for i in range(options['buckets'])], 100 // options['buckets'])
+        feet_buckets = make_buckets(FeetBucket, [(3, 5), (6, 10), (11, 15), (16, 20), (21, 25)], 15)
+        max_yard = yard_buckets[-1].max
+
+        self.stdout.write('PICK_COUNT=%d, %d calls per row\n' % (settings.PICK_COUNT, number))
+        self.stdout.write('%-14s %6s %12s %12s %8s' % ('case', 'used', 'set (us)', 'numpy (us)', 'speedup'))
+
+        for used in options['used']:
+            excepted = random.sample(range(75, max_yard + 1), min(used, max_yard - 74))
+            excepted_feet = random.sample(range(3, 26), min(used, 23))
+
+            cases = [
+                ('pick', yard_buckets, lambda sampler: sampler.pick(excepted)),
+                ('pick(driver)', yard_buckets, lambda sampler: sampler.pick(excepted, max_limit=max_yard // 2)),
+                ('pick_standard', feet_buckets, lambda sampler: sampler.pick_standard(excepted_feet)),
+            ]
+
+            for name, buckets, call in cases:
+                timings = {}
+                for kind in ('set', 'numpy'):
+                    sampler = SAMPLERS[kind](buckets)
+                    timings[kind] = timeit.timeit(lambda: call(sampler), number=number) / number * 1e6
+
+                self.stdout.write('%-14s %6d %12.1f %12.1f %7.1fx' % (
+                    name, used, timings['set'], timings['numpy'], timings['set'] / timings['numpy']))
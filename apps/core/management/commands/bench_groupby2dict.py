@@ -0,0 +1,76 @@
+import timeit
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from core.utils import groupby2dict
+
+
+def groupby2dict_rows(grouped_df):
+    """
+    previous implementation (row by row), timed against groupby2dict (see core.tests for the equivalence)
+    """
+    levels = len(grouped_df.index.levels)
+    dicts = [{} for i in range(levels)]
+    last_index = None
+
+    for index, value in grouped_df.itertuples():
+
+        if not last_index:
+            last_index = index
+
+        for (ii, (i, j)) in enumerate(zip(index, last_index)):
+            if not i == j:
+                ii = levels - ii - 1
+                dicts[:ii] = [{} for _ in dicts[:ii]]
+                break
+
+        for i, key in enumerate(reversed(index)):
+            dicts[i][key] = value
+            value = dicts[i]
+
+        last_index = index
+
+    return dicts[-1]
+
+
+def make_level(kind, size):
+    if kind == 'club':
+        return ['Club %d' % i for i in range(size)]
+    elif kind == 'day':
+        return [day.strftime('%Y-%m-%d') for day in pd.date_range('2015-01-01', periods=size)]
+    else:
+        return list(range(3, 3 + size))
+
+
+def make_product(rows, level_kinds, rng):
+    """
+    :return: frame of exactly param:rows groups, in groupby order
+    """
+    index = pd.MultiIndex.from_product([make_level(kind, size) for kind, size in level_kinds],
+                                       names=[kind for kind, _ in level_kinds])[:rows]
+    return pd.DataFrame({'mean': rng.random_sample(len(index))}, index=index)
+
+
+class Command(BaseCommand):
+    help = "Benchmark groupby2dict against the row by row implementation."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.RandomState(options['seed'])
+
+        self.stdout.write('%10s %8s %14s %14s %8s' % ('groups', 'levels', 'rows (ms)', 'codes (ms)', 'speedup'))
+        for rows in options['rows']:
+            for level_kinds in ([('club', 14), ('day', -(-rows // 14))],
+                                [('feet', 5), ('club', 14), ('day', -(-rows // 70))]):
+                grouped = make_product(rows, level_kinds, rng)
+
+                number = max(1, 100000 // rows)
+                old = timeit.timeit(lambda: groupby2dict_rows(grouped), number=number) / number * 1000
+                new = timeit.timeit(lambda: groupby2dict(grouped), number=number) / number * 1000
+
+                self.stdout.write('%10d %8d %14.1f %14.1f %7.1fx' % (len(grouped), len(level_kinds), old, new, old / new))
@@ -0,0 +1,120 @@
+import datetime
+import math
+import multiprocessing
+import random
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.analytics import CLUB_CHARTS, chart_columns, frame_charts, fold_rows, STREAM_CHUNK_SIZE
+
+
+CLUBS = ['Driver', '3 Wood', '5 Wood', '3 Iron', '4 Iron', '5 Iron', '6 Iron', '7 Iron', '8 Iron', '9 Iron',
+         'PW', 'GW', 'SW', 'LW']
+AIMS = ['Draw', 'Straight', 'Fade']
+TRAJECTORIES = ['Low', 'Mid', 'High']
+
+
+def synthetic_rows(count, days, seed):
+    """
+    Shots like club_shots.values_list(*chart_columns(CLUB_CHARTS)), generated lazily as a cursor would return them.
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2016, 1, 1, tzinfo=timezone.utc)
+    accuracy = [None, 0, 1]
+
+    values = {
+        'reported_at': lambda: start + datetime.timedelta(seconds=rng.randrange(days * 86400)),
+        'club': lambda: rng.choice(CLUBS),
+        'aim': lambda: rng.choice(AIMS),
+        'trajectory': lambda: rng.choice(TRAJECTORIES),
+        'hit': lambda: rng.randint(0, 1),
+        'distance': lambda: rng.randint(75, 300),
+        'distance_accuracy': lambda: rng.choice(accuracy),
+        'aim_accuracy': lambda: rng.choice(accuracy),
+        'trajectory_accuracy': lambda: rng.choice(accuracy),
+    }
+    makers = [values[column] for column in chart_columns(CLUB_CHARTS)]
+    for _ in range(count):
+        yield tuple(make() for make in makers)
+
+
+def run_pandas(rows):
+    return frame_charts(list(rows), chart_columns(CLUB_CHARTS), CLUB_CHARTS)
+
+
+def run_stream(rows, chunk_size):
+    return fold_rows(rows, chart_columns(CLUB_CHARTS), CLUB_CHARTS, chunk_size)
+
+
+def current_rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() // 1024
+
+
+def measure(conn, engine, count, days, seed, chunk_size):
+    """
+    Runs in a child process, so the peak RSS of one run is not hidden by an earlier, bigger one.
+    """
+    rows = synthetic_rows(count, days, seed)
+    start_rss = current_rss_kb()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    if engine == 'pandas':
+        run_pandas(rows)
+    else:
+        run_stream(rows, chunk_size)
+
+    elapsed = time.perf_counter() - start
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux
+
+    conn.send((elapsed, traced_peak / 1024 / 1024, max(peak_rss - start_rss, 0) / 1024))
+    conn.close()
+
+
+def same_charts(left, right):
+    if isinstance(left, dict):
+        return isinstance(right, dict) and list(left) == list(right) and \
+            all(same_charts(left[key], right[key]) for key in left)
+    if isinstance(left, float) and math.isnan(left):
+        return isinstance(right, float) and math.isnan(right)
+    return math.isclose(left, right, rel_tol=1e-9)
+
+
+class Command(BaseCommand):
+    help = "Compare peak memory and wall time of the pandas and streaming report chart engines " \
+           "on synthetic shots (no database required). Times include generating the rows and tracemalloc overhead."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shots', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--days', type=int, default=730, help='days covered by the shots')
+        parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        days, seed, chunk_size = options['days'], options['seed'], options['chunk_size']
+
+        # both engines must return the same charts
+        check_count = min(options['shots'])
+        expected = run_pandas(synthetic_rows(check_count, days, seed))
+        if not same_charts(expected, run_stream(synthetic_rows(check_count, days, seed), chunk_size)):
+            raise CommandError('The streaming engine returned different charts')
+        self.stdout.write('equivalence on %d shots: OK' % check_count)
+
+        self.stdout.write('%10s %8s %10s %16s %14s' % ('shots', 'engine', 'time (s)', 'traced peak (MB)', 'RSS peak (MB)'))
+        for count in options['shots']:
+            for engine in ('pandas', 'stream'):
+                parent_conn, child_conn = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=measure,
+                                                  args=(child_conn, engine, count, days, seed, chunk_size))
+                process.start()
+                elapsed, traced_peak, rss_peak = parent_conn.recv()
+                process.join()
+
+                self.stdout.write('%10d %8s %10.2f %16.1f %14.1f' % (count, engine, elapsed, traced_peak, rss_peak))
@@ -0,0 +1,88 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+
+from api.v1.serializers.core import ScoreCardReportSerializer
+from core.models import Practice, ScoreShotReport, PRACTICE_TYPES, MAX_SCORE_CARD_SCORE
+from core.rollups import add_score_shots
+
+
+User = get_user_model()
+
+
+class Request(object):
+    def __init__(self, user):
+        self.user = user
+
+
+def save_per_row(user, practice_type, score_card):
+    """
+    previous write path: one INSERT per turn, then the practice stats UPDATE
+    """
+    with transaction.atomic():
+        practice = Practice.objects.create(user=user, practice_type=practice_type)
+        shots = [ScoreShotReport.objects.create(practice=practice, **turn) for turn in score_card]
+        Practice.objects.filter(pk=practice.pk).update(
+            shot_count=F('shot_count') + len(shots),
+            score=F('score') + sum(shot.points for shot in shots),
+            max_score=MAX_SCORE_CARD_SCORE,
+        )
+        add_score_shots(practice, shots)
+
+
+def save_bulk(user, practice_type, score_card):
+    serializer = ScoreCardReportSerializer(context={'request': Request(user)})
+    serializer.create({'practice_type': practice_type, 'score_card': score_card})
+
+
+class Command(BaseCommand):
+    help = "Compare the per-row and bulk score card writes. All rows are rolled back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='user id (default: first user)')
+        parser.add_argument('--turns', type=int, nargs='+', default=[25, 100, 1000], help='turns per score card')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(pk=options['user']).first() if options['user'] else User.objects.first()
+        if user is None:
+            raise CommandError('No user to report as')
+
+        self.stdout.write('%6s %14s %8s %14s %8s %8s' % ('turns', 'per row (ms)', 'queries', 'bulk (ms)', 'queries', 'speedup'))
+
+        for turns in options['turns']:
+            score_card = [{'putt_counts': random.randint(1, 3), 'points': random.randint(-5, 10)} for _ in range(turns)]
+
+            results = {}
+            for name, save in (('per_row', save_per_row), ('bulk', save_bulk)):
+                results[name] = self.measure(save, user, score_card, options['repeat'])
+
+            self.stdout.write('%6d %14.1f %8d %14.1f %8d %7.1fx' % (
+                turns, results['per_row'][0], results['per_row'][1], results['bulk'][0], results['bulk'][1],
+                results['per_row'][0] / results['bulk'][0]))
+
+    def measure(self, save, user, score_card, repeat):
+        """
+        :return: (best time in ms, number of queries)
+        """
+        best, queries = None, 0
+        for _ in range(repeat):
+            with transaction.atomic():
+                with connection.execute_wrapper(self.count_query):
+                    self.queries = 0
+                    start = time.perf_counter()
+                    save(user, PRACTICE_TYPES.within_3feet, score_card)
+                    elapsed = (time.perf_counter() - start) * 1000
+                transaction.set_rollback(True)
+
+            best = elapsed if best is None else min(best, elapsed)
+            queries = self.queries
+        return best, queries
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.models import DeltaShotReport, ScoreShotReport, Practice
+from core.utils import count_practice_sessions, is_full_swing, is_short_game
+
+
+User = get_user_model()
+
+
+def count_from_reports(practices):
+    """
+    previous count: practices with at least one DeltaShotReport or ScoreShotReport, by joining the reports
+    """
+    counts = {'long': 0, 'short': 0, 'putting': 0}
+    practice_ids = practices.values('id')
+
+    practice_list = \
+        list(DeltaShotReport.objects.filter(practice__id__in=practice_ids)
+             .values('practice__id', 'practice__practice_type').distinct()
+             .order_by('practice__id')) + \
+        list(ScoreShotReport.objects.filter(practice__id__in=practice_ids)
+             .values('practice__id', 'practice__practice_type').distinct()
+             .order_by('practice__id'))
+
+    for p in practice_list:
+        p_type = p.get('practice__practice_type')
+        if is_full_swing(p_type):
+            counts['long'] += 1
+        elif is_short_game(p_type):
+            counts['short'] += 1
+        else:
+            counts['putting'] += 1
+    return counts
+
+
+class Command(BaseCommand):
+    help = "Compare the session counts of the report page (from the practice stats) with the counts from the reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+', help='only these user ids (default: every user)')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['users']:
+            users = users.filter(pk__in=options['users'])
+
+        checked = 0
+        different = 0
+        for user_id in users.values_list('pk', flat=True).iterator():
+            checked += 1
+            practices = Practice.objects.filter(user_id=user_id)
+            counts = count_practice_sessions(practices)
+            expected = count_from_reports(practices)
+
+            if counts != expected:
+                different += 1
+                self.stdout.write('user %d: %s, from the reports %s (run sync_practice_stats)' % (
+                    user_id, counts, expected))
+
+        self.stdout.write(self.style.SUCCESS('Checked %d users, %d different' % (checked, different)))
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F
+
+from core.rollups import rebuild_rollups
+
+
+def rebuild_chunk(user_ids):
+    try:
+        return rebuild_rollups(user_ids)
+    finally:
+        connection.close()  # every worker thread has its own connection
+
+
+class Command(BaseCommand):
+    help = "Rebuild ShotRollup rows from the shot reports, in parallel chunks of users. " \
+           "Reports arriving for a chunk while it is rebuilt are not counted, so run it off-peak."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+', help='only rebuild these user ids')
+        parser.add_argument('--stale', action='store_true',
+                            help='only rebuild users whose rollups are not in their current time zone')
+        parser.add_argument('--chunk-size', type=int, default=50, help='users per chunk')
+        parser.add_argument('--workers', type=int, default=4, help='chunks rebuilt in parallel')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('pk')
+        if options['stale']:
+            users = users.exclude(rollups_timezone=F('timezone'))
+        user_ids = options['users'] or list(users.values_list('pk', flat=True))
+        chunk_size = options['chunk_size']
+        chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+
+        total = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for done, count in enumerate(executor.map(rebuild_chunk, chunks), 1):
+                total += count
+                self.stdout.write('chunk %d/%d: %d rollups' % (done, len(chunks), count))
+
+        self.stdout.write(self.style.SUCCESS('Rebuilt %d rollups for %d users' % (total, len(user_ids))))
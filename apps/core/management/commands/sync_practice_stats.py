@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum, OuterRef, Subquery, IntegerField
+
+from core.models import Practice, DeltaShotReport, ScoreShotReport, SCORE_PRACTICE_TYPES, MAX_SCORE_CARD_SCORE
+
+
+def report_stats(model, field):
+    reports = model.objects.filter(practice=OuterRef('pk')).order_by().values('practice')
+    count = Subquery(reports.annotate(value=Count('id')).values('value'), output_field=IntegerField())
+    total = Subquery(reports.annotate(value=Sum(field)).values('value'), output_field=IntegerField())
+    return count, total
+
+
+class Command(BaseCommand):
+    help = "Check (--check) or backfill the stored shot_count/score/max_score of practices from their reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='only report inconsistent practices')
+        parser.add_argument('--users', type=int, nargs='+', help='only these user ids')
+
+    def handle(self, *args, **options):
+        delta_count, delta_hits = report_stats(DeltaShotReport, 'hit')
+        score_count, score_points = report_stats(ScoreShotReport, 'points')
+
+        practices = Practice.objects.order_by('pk').annotate(
+            delta_count=delta_count, delta_hits=delta_hits,
+            score_count=score_count, score_points=score_points,
+        ).values_list('pk', 'practice_type', 'shot_count', 'score', 'max_score',
+                      'delta_count', 'delta_hits', 'score_count', 'score_points')
+
+        if options['users']:
+            practices = practices.filter(user_id__in=options['users'])
+
+        checked = 0
+        inconsistent = 0
+        for pk, practice_type, *stored, d_count, d_hits, s_count, s_points in practices.iterator():
+            checked += 1
+
+            if practice_type in SCORE_PRACTICE_TYPES:
+                expected = [s_count or 0, s_points or 0, MAX_SCORE_CARD_SCORE]
+            else:
+                expected = [d_count or 0, d_hits or 0, d_count or 0]
+
+            if stored == expected:
+                continue
+
+            inconsistent += 1
+            self.stdout.write('practice %d: stored (shot_count, score, max_score)=%s, expected %s' % (
+                pk, tuple(stored), tuple(expected)))
+
+            if not options['check']:
+                Practice.objects.filter(pk=pk).update(
+                    shot_count=expected[0], score=expected[1], max_score=expected[2])
+
+        action = 'found' if options['check'] else 'fixed'
+        self.stdout.write(self.style.SUCCESS('Checked %d practices, %s %d inconsistent' % (checked, action, inconsistent)))
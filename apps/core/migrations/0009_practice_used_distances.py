@@ -0,0 +1,40 @@
+# Generated by Django 2.0.3 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+from core.bitmap import add_distances
+
+
+def fill_used_distances(apps, schema_editor):
+    Practice = apps.get_model('core', 'Practice')
+    DeltaShotReport = apps.get_model('core', 'DeltaShotReport')
+
+    rows = DeltaShotReport.objects.order_by('practice_id').values_list('practice_id', 'distance').distinct()
+
+    practice_id = None
+    distances = []
+    for row_practice_id, distance in rows.iterator():
+        if row_practice_id != practice_id and distances:
+            Practice.objects.filter(pk=practice_id).update(used_distances=add_distances(b'', distances))
+            distances = []
+        practice_id = row_practice_id
+        distances.append(distance)
+
+    if distances:
+        Practice.objects.filter(pk=practice_id).update(used_distances=add_distances(b'', distances))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_auto_20181017_1951'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practice',
+            name='used_distances',
+            field=models.BinaryField(default=b'', editable=False),
+        ),
+        migrations.RunPython(fill_used_distances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 2.0.3 on 2026-10-18 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# NOTE: same rows as "rebuild_shot_rollups" (core.rollups.rebuild_rollups), days in UTC (users have no time zone
+# yet), yard buckets for full swing types (0, 1, 2, 3, 8) and accuracy flags from delta (as in migration 0012)
+FILL_ROLLUPS = """
+INSERT INTO core_shotrollup (
+    user_id, day, practice_type, bucket, club, shots, hits, points, distance_sum, max_distance,
+    distance_acc_count, distance_acc_sum, aim_acc_count, aim_acc_sum, trajectory_acc_count, trajectory_acc_sum)
+SELECT user_id, day, practice_type, bucket, club, COUNT(*), SUM(hit), 0, SUM(distance), MAX(distance),
+       COUNT(distance_acc), COALESCE(SUM(distance_acc), 0),
+       COUNT(aim_acc), COALESCE(SUM(aim_acc), 0),
+       COUNT(trajectory_acc), COALESCE(SUM(trajectory_acc), 0)
+FROM (
+    SELECT p.user_id,
+           (s.reported_at AT TIME ZONE 'UTC')::date AS day,
+           p.practice_type,
+           CASE WHEN p.practice_type IN (0, 1, 2, 3, 8) THEN COALESCE((
+               SELECT b.id FROM constant_yardbucket b WHERE b.min <= s.distance AND s.distance < b.max
+               ORDER BY b.min LIMIT 1), 0) ELSE 0 END AS bucket,
+           COALESCE(s.club, '') AS club,
+           s.hit,
+           s.distance,
+           CASE COALESCE(s.delta->>'distanceText', '') WHEN '' THEN NULL WHEN 'ACCURATE' THEN 1 ELSE 0 END AS distance_acc,
+           CASE COALESCE(s.delta->>'aimText', '') WHEN '' THEN NULL WHEN 'ACCURATE' THEN 1 ELSE 0 END AS aim_acc,
+           CASE COALESCE(s.delta->>'trajectoryText', '') WHEN '' THEN NULL WHEN 'ACCURATE' THEN 1 ELSE 0 END AS trajectory_acc
+    FROM core_deltashotreport s JOIN core_practice p ON p.id = s.practice_id
+) shots
+GROUP BY 1, 2, 3, 4, 5;
+
+INSERT INTO core_shotrollup (
+    user_id, day, practice_type, bucket, club, shots, hits, points, distance_sum, max_distance,
+    distance_acc_count, distance_acc_sum, aim_acc_count, aim_acc_sum, trajectory_acc_count, trajectory_acc_sum)
+SELECT p.user_id, (s.reported_at AT TIME ZONE 'UTC')::date, p.practice_type, 0, '', COUNT(*), 0, SUM(s.points), 0, 0,
+       0, 0, 0, 0, 0, 0
+FROM core_scoreshotreport s JOIN core_practice p ON p.id = s.practice_id
+GROUP BY 1, 2, 3
+ON CONFLICT (user_id, day, practice_type, bucket, club) DO UPDATE SET
+    shots = core_shotrollup.shots + EXCLUDED.shots,
+    points = core_shotrollup.points + EXCLUDED.points;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0009_practice_used_distances'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShotRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('practice_type', models.PositiveSmallIntegerField(choices=[(0, 'Full Swing (Gated Random)'), (1, 'Serial'), (2, 'Block'), (3, 'Warmup'), (8, 'Custom Practice'), (4, 'Putting (Gated Random )'), (5, 'Putting (Standard)'), (9, 'Putting (Custom)'), (22, 'Putting (Within 3 Feet)'), (23, 'Putting (6 Foot Challenge)'), (6, 'Around the green (Chip)'), (7, 'Around the green (Pitch)')])),
+                ('bucket', models.PositiveIntegerField(default=0, help_text='YardBucket id (0: not in a yard bucket)')),
+                ('club', models.CharField(blank=True, default='', max_length=128)),
+                ('shots', models.PositiveIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('points', models.IntegerField(default=0, help_text='score card points')),
+                ('distance_sum', models.BigIntegerField(default=0)),
+                ('max_distance', models.PositiveIntegerField(default=0)),
+                ('distance_acc_count', models.PositiveIntegerField(default=0)),
+                ('distance_acc_sum', models.PositiveIntegerField(default=0)),
+                ('aim_acc_count', models.PositiveIntegerField(default=0)),
+                ('aim_acc_sum', models.PositiveIntegerField(default=0)),
+                ('trajectory_acc_count', models.PositiveIntegerField(default=0)),
+                ('trajectory_acc_sum', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shot_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='shotrollup',
+            unique_together={('user', 'day', 'practice_type', 'bucket', 'club')},
+        ),
+        migrations.RunSQL(FILL_ROLLUPS, migrations.RunSQL.noop),
+    ]
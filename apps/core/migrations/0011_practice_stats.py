@@ -0,0 +1,49 @@
+# Generated by Django 2.0.3 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+# NOTE: practice types 22, 23 are scored by ScoreShotReport (core.models.SCORE_PRACTICE_TYPES)
+FILL_PRACTICE_STATS = """
+UPDATE core_practice p SET shot_count = r.shot_count, score = r.score, max_score = r.shot_count
+FROM (SELECT practice_id, COUNT(*) AS shot_count, COALESCE(SUM(hit), 0) AS score
+      FROM core_deltashotreport GROUP BY practice_id) r
+WHERE p.id = r.practice_id AND p.practice_type NOT IN (22, 23);
+
+UPDATE core_practice p SET shot_count = r.shot_count, score = r.score
+FROM (SELECT practice_id, COUNT(*) AS shot_count, COALESCE(SUM(points), 0) AS score
+      FROM core_scoreshotreport GROUP BY practice_id) r
+WHERE p.id = r.practice_id AND p.practice_type IN (22, 23);
+
+UPDATE core_practice SET max_score = 250 WHERE practice_type IN (22, 23);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_shotrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practice',
+            name='max_score',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='practice',
+            name='score',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='practice',
+            name='shot_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='practice',
+            index=models.Index(fields=['user', '-created_at'], name='practice_user_created_idx'),
+        ),
+        migrations.RunSQL(FILL_PRACTICE_STATS, migrations.RunSQL.noop),
+    ]
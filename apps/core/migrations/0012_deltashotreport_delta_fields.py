@@ -0,0 +1,107 @@
+# Generated by Django 2.0.3 on 2026-10-18 13:10
+
+from django.db import migrations, models, transaction
+
+
+BACKFILL_CHUNK_SIZE = 10000
+
+# same as DeltaShotReport.set_delta_fields (->> returns any JSON value as text, like delta_text)
+FILL_DELTA_FIELDS = """
+UPDATE core_deltashotreport SET
+    distance_accuracy = CASE COALESCE(delta->>'distanceText', '') WHEN '' THEN NULL WHEN 'ACCURATE' THEN 1 ELSE 0 END,
+    aim_accuracy = CASE COALESCE(delta->>'aimText', '') WHEN '' THEN NULL WHEN 'ACCURATE' THEN 1 ELSE 0 END,
+    trajectory_accuracy = CASE COALESCE(delta->>'trajectoryText', '') WHEN '' THEN NULL WHEN 'ACCURATE' THEN 1 ELSE 0 END,
+    is_left = CASE WHEN delta->>'aimText' LIKE 'LEFT%%' THEN 1 ELSE 0 END,
+    is_right = CASE WHEN delta->>'aimText' LIKE 'RIGHT%%' THEN 1 ELSE 0 END,
+    is_short = CASE WHEN delta->>'distanceText' LIKE 'SHORT%%' THEN 1 ELSE 0 END,
+    is_long = CASE WHEN delta->>'distanceText' LIKE 'LONG%%' THEN 1 ELSE 0 END
+WHERE id >= %s AND id < %s
+"""
+
+
+def fill_delta_fields(apps, schema_editor):
+    """
+    Fills the columns in id ranges, one transaction per chunk.
+    NOTE: the columns are added as nullable without default, so adding them only changes the catalog and the
+    table is not rewritten, the rows are then locked one chunk at a time.
+    """
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT MIN(id), MAX(id) FROM core_deltashotreport')
+        min_id, max_id = cursor.fetchone()
+
+    if min_id is None:
+        return
+
+    for start in range(min_id, max_id + 1, BACKFILL_CHUNK_SIZE):
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(FILL_DELTA_FIELDS, [start, start + BACKFILL_CHUNK_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_practice_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deltashotreport',
+            name='aim_accuracy',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Inaccurate'), (1, 'Accurate')], editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='deltashotreport',
+            name='distance_accuracy',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Inaccurate'), (1, 'Accurate')], editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='deltashotreport',
+            name='is_left',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='deltashotreport',
+            name='is_long',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='deltashotreport',
+            name='is_right',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='deltashotreport',
+            name='is_short',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='deltashotreport',
+            name='trajectory_accuracy',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Inaccurate'), (1, 'Accurate')], editable=False, null=True),
+        ),
+        migrations.RunPython(fill_delta_fields, migrations.RunPython.noop),
+        # NOTE: model default only, no DDL (a column DEFAULT would rewrite the table before PostgreSQL 11)
+        migrations.AlterField(
+            model_name='deltashotreport',
+            name='is_left',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='deltashotreport',
+            name='is_long',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='deltashotreport',
+            name='is_right',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='deltashotreport',
+            name='is_short',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, null=True),
+        ),
+    ]
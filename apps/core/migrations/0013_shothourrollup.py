@@ -0,0 +1,46 @@
+# Generated by Django 2.0.3 on 2026-10-18 14:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# NOTE: every user is in UTC when the table is created (profiles.User.timezone default)
+FILL_HOUR_ROLLUPS = """
+INSERT INTO core_shothourrollup (user_id, day, hour, shots, hits)
+SELECT p.user_id,
+       (s.reported_at AT TIME ZONE 'UTC')::date,
+       EXTRACT(HOUR FROM s.reported_at AT TIME ZONE 'UTC'),
+       COUNT(*),
+       SUM(s.hit)
+FROM core_deltashotreport s JOIN core_practice p ON p.id = s.practice_id
+GROUP BY 1, 2, 3;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('profiles', '0005_user_timezone'),
+        ('core', '0012_deltashotreport_delta_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShotHourRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('shots', models.PositiveIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shot_hour_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='shothourrollup',
+            unique_together={('user', 'day', 'hour')},
+        ),
+        migrations.RunSQL(FILL_HOUR_ROLLUPS, migrations.RunSQL.noop),
+    ]
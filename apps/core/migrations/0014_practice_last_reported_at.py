@@ -0,0 +1,34 @@
+# Generated by Django 2.0.3 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+FILL_LAST_REPORTED_AT = """
+UPDATE core_practice p SET last_reported_at = r.last_reported_at
+FROM (SELECT practice_id, MAX(reported_at) AS last_reported_at FROM core_deltashotreport GROUP BY practice_id) r
+WHERE p.id = r.practice_id;
+
+UPDATE core_practice p SET last_reported_at = r.last_reported_at
+FROM (SELECT practice_id, MAX(reported_at) AS last_reported_at FROM core_scoreshotreport GROUP BY practice_id) r
+WHERE p.id = r.practice_id AND (p.last_reported_at IS NULL OR p.last_reported_at < r.last_reported_at);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_shothourrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practice',
+            name='last_reported_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Time of the last report, for the incremental history sync', null=True),
+        ),
+        migrations.RunSQL(FILL_LAST_REPORTED_AT, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='practice',
+            index=models.Index(fields=['user', 'last_reported_at'], name='practice_user_reported_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.0.3 on 2026-10-19 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_practice_last_reported_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SharedVersionCounter',
+            fields=[
+                ('key', models.CharField(max_length=128, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
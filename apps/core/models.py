@@ -1,12 +1,16 @@
-from django.db import models
-from django.db.models import Sum
+from collections import OrderedDict
+
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.postgres.fields import JSONField
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from model_utils import Choices
 
 from constant.models import ShotImage, DistanceDiffRange, AimValueRange, AimDiffRange, \
     TrajectoryValueRange, TrajectoryDiffRange, YardBucket, FeetBucket, ClubType
+from core.bitmap import decode_distances, add_distances
 
 
 PRACTICE_TYPES = Choices(
@@ -35,6 +39,39 @@ PRACTICE_TYPES = Choices(
         (7, 'pitch', _('Around the green (Pitch)')),
     )
 
+# session categories of the report page
+FULL_SWING_PRACTICE_TYPES = [PRACTICE_TYPES.random, PRACTICE_TYPES.warmup, PRACTICE_TYPES.serial,
+                             PRACTICE_TYPES.block, PRACTICE_TYPES.custom]
+SHORT_GAME_PRACTICE_TYPES = [PRACTICE_TYPES.chip, PRACTICE_TYPES.pitch]
+PRACTICE_CATEGORIES = OrderedDict([
+    ('long', FULL_SWING_PRACTICE_TYPES),
+    ('short', SHORT_GAME_PRACTICE_TYPES),
+    ('putting', [value for value, _ in PRACTICE_TYPES
+                 if value not in FULL_SWING_PRACTICE_TYPES + SHORT_GAME_PRACTICE_TYPES]),
+])
+
+# practices reported by ScoreShotReport (score cards), standard putting is reported by DeltaShotReport
+SCORE_PRACTICE_TYPES = [PRACTICE_TYPES.within_3feet, PRACTICE_TYPES.challenge_6foot]
+MAX_SCORE_CARD_SCORE = 250  # NOTE: hardcode
+
+# accuracy of a delta text (distanceText/aimText/trajectoryText), NULL: not reported
+ACCURACY = Choices(
+        (0, 'inaccurate', _('Inaccurate')),
+        (1, 'accurate', _('Accurate')),
+    )
+
+
+def accuracy_flag(text):
+    """
+    :return: 1: ACCURATE, 0: not accurate, None: not reported
+    """
+    if text is None or text == '':
+        return None
+    elif text == 'ACCURATE':
+        return ACCURACY.accurate
+    else:
+        return ACCURACY.inaccurate
+
 
 class Practice(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="practices")
@@ -45,6 +82,16 @@ class Practice(models.Model):
     min_dist = models.PositiveIntegerField(null=True, blank=True)
     max_dist = models.PositiveIntegerField(null=True, blank=True)
 
+    # bitmap of reported distances (see core.bitmap)
+    used_distances = models.BinaryField(default=b'', editable=False)
+
+    # stats of the reports, updated on every report (see "sync_practice_stats")
+    shot_count = models.PositiveIntegerField(default=0, editable=False)
+    score = models.IntegerField(default=0, editable=False)
+    max_score = models.IntegerField(default=0, editable=False)
+    last_reported_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                            help_text='Time of the last report, for the incremental history sync')
+
     # @property
     # def is_full_swing(self):
     #     if self.practice_type in [PRACTICE_TYPES.random, PRACTICE_TYPES.warmup,
@@ -63,46 +110,69 @@ class Practice(models.Model):
 
     @property
     def is_valid(self):
-        try:
-            if self.reports.count() > 0:
-                return True
-        except Exception:
-            pass
+        return self.shot_count > 0
+
+    @property
+    def is_score_card(self):
+        return self.practice_type in SCORE_PRACTICE_TYPES
 
-        return False
+    def get_existing_dist_list(self):
+        """
+        :return: distances already reported in this practice
+        """
+        return decode_distances(self.used_distances)
+
+    def add_delta_reports(self, shots):
+        """
+        :param shots: saved DeltaShotReport objects of this practice
+        Marks the distances as used and adds the shots to shot_count/score/max_score.
+        NOTE: the row is locked, so concurrent reports to the same practice don't lose bits.
+        """
+        with transaction.atomic():
+            locked = Practice.objects.select_for_update().only('used_distances').get(pk=self.pk)
+            self.used_distances = add_distances(locked.used_distances, [shot.distance for shot in shots])
+
+            self.last_reported_at = timezone.now()
+            updates = {'used_distances': self.used_distances, 'last_reported_at': self.last_reported_at}
+            if not self.is_score_card:  # score card practices are scored by ScoreShotReport only
+                updates.update(self._stats_updates(len(shots), sum(shot.hit for shot in shots)))
+
+            Practice.objects.filter(pk=self.pk).update(**updates)
+
+    def _stats_updates(self, shot_count, score):
+        self.shot_count += shot_count
+        self.score += score
+        self.max_score = MAX_SCORE_CARD_SCORE if self.is_score_card else self.max_score + shot_count
+
+        return {
+            'shot_count': F('shot_count') + shot_count,
+            'score': F('score') + score,
+            'max_score': MAX_SCORE_CARD_SCORE if self.is_score_card else F('max_score') + shot_count,
+        }
 
     @property
     def reports(self):
-        if self.practice_type in [PRACTICE_TYPES.standard_putting,
-                                  PRACTICE_TYPES.within_3feet,
-                                  PRACTICE_TYPES.challenge_6foot]:
+        if self.is_score_card:
             return ScoreShotReport.objects.filter(practice=self)
         else:
             return DeltaShotReport.objects.filter(practice=self)
 
-    @property
-    def max_score(self):
-        if self.practice_type in [PRACTICE_TYPES.standard_putting,
-                                  PRACTICE_TYPES.within_3feet,
-                                  PRACTICE_TYPES.challenge_6foot]:
-            return 250  # NOTE: hardcode
-        else:
-            return DeltaShotReport.objects.filter(practice=self).count()
-
-    @property
-    def score(self):
-        try:
-            if self.practice_type in [PRACTICE_TYPES.standard_putting, PRACTICE_TYPES.within_3feet, PRACTICE_TYPES.challenge_6foot]:
-                shots = ScoreShotReport.objects.filter(practice=self).aggregate(Sum('points'))
-                return shots['points__sum']
-            else:
-                shots = DeltaShotReport.objects.filter(practice=self).aggregate(Sum('hit'))
-                return shots['hit__sum']
-        except Exception:
-            return 0
-
     class Meta:
         ordering = ('-created_at', )
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='practice_user_created_idx'),
+            models.Index(fields=['user', 'last_reported_at'], name='practice_user_reported_idx'),
+        ]
+
+
+def delta_text(delta, key):
+    """
+    :return: text of the delta as a string ('' if not reported), clients may send other JSON values
+    """
+    value = delta.get(key)
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else str(value)
 
 
 class DeltaShotReport(models.Model):
@@ -118,6 +188,37 @@ class DeltaShotReport(models.Model):
 
     hit = models.PositiveSmallIntegerField(choices=((1, 'Hit'), (0, 'Miss')))
 
+    # extracted from delta (see set_delta_fields), for aggregation in SQL
+    distance_accuracy = models.PositiveSmallIntegerField(choices=ACCURACY, null=True, blank=True, editable=False)
+    aim_accuracy = models.PositiveSmallIntegerField(choices=ACCURACY, null=True, blank=True, editable=False)
+    trajectory_accuracy = models.PositiveSmallIntegerField(choices=ACCURACY, null=True, blank=True, editable=False)
+    # NOTE: nullable, so adding them doesn't rewrite the table, every row is filled (migration 0012 and save())
+    is_left = models.PositiveSmallIntegerField(null=True, default=0, editable=False)
+    is_right = models.PositiveSmallIntegerField(null=True, default=0, editable=False)
+    is_short = models.PositiveSmallIntegerField(null=True, default=0, editable=False)
+    is_long = models.PositiveSmallIntegerField(null=True, default=0, editable=False)
+
+    def set_delta_fields(self):
+        """
+        Copies the delta texts into the typed columns.
+        NOTE: bulk_create doesn't call save(), so call this before it.
+        """
+        delta = self.delta if isinstance(self.delta, dict) else {}
+        distance_text = delta_text(delta, 'distanceText')
+        aim_text = delta_text(delta, 'aimText')
+
+        self.distance_accuracy = accuracy_flag(distance_text)
+        self.aim_accuracy = accuracy_flag(aim_text)
+        self.trajectory_accuracy = accuracy_flag(delta.get('trajectoryText'))
+        self.is_left = int(aim_text.startswith('LEFT'))
+        self.is_right = int(aim_text.startswith('RIGHT'))
+        self.is_short = int(distance_text.startswith('SHORT'))
+        self.is_long = int(distance_text.startswith('LONG'))
+
+    def save(self, *args, **kwargs):
+        self.set_delta_fields()
+        super(DeltaShotReport, self).save(*args, **kwargs)
+
     class Meta:
         ordering = ('practice', 'reported_at',)
 
@@ -132,3 +233,58 @@ class ScoreShotReport(models.Model):
 
     class Meta:
         ordering = ('practice', 'reported_at',)
+
+
+class ShotRollup(models.Model):
+    """
+    Shot statistics per user, day (in the timezone of the user), practice type, yard bucket and club.
+
+    Updated with every report (see core.rollups), rebuilt by "rebuild_shot_rollups".
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='shot_rollups')
+    day = models.DateField()
+    practice_type = models.PositiveSmallIntegerField(choices=PRACTICE_TYPES)
+    bucket = models.PositiveIntegerField(default=0, help_text='YardBucket id (0: not in a yard bucket)')
+    club = models.CharField(max_length=128, default='', blank=True)
+
+    shots = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    points = models.IntegerField(default=0, help_text='score card points')
+    distance_sum = models.BigIntegerField(default=0)
+    max_distance = models.PositiveIntegerField(default=0)
+
+    # accuracy flags of delta (distanceText/aimText/trajectoryText == 'ACCURATE')
+    distance_acc_count = models.PositiveIntegerField(default=0)
+    distance_acc_sum = models.PositiveIntegerField(default=0)
+    aim_acc_count = models.PositiveIntegerField(default=0)
+    aim_acc_sum = models.PositiveIntegerField(default=0)
+    trajectory_acc_count = models.PositiveIntegerField(default=0)
+    trajectory_acc_sum = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day', 'practice_type', 'bucket', 'club')
+
+
+class ShotHourRollup(models.Model):
+    """
+    Delta shots per user, day and hour (in the timezone of the user), for the daily activity.
+
+    Updated with every report (see core.rollups), rebuilt by "rebuild_shot_rollups".
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='shot_hour_rollups')
+    day = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+
+    shots = models.PositiveIntegerField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day', 'hour')
+
+
+class SharedVersionCounter(models.Model):
+    """
+    Version counters of core.cache.SharedVersion, incremented in the transaction that changes the data.
+    """
+    key = models.CharField(max_length=128, primary_key=True)
+    value = models.BigIntegerField(default=0)
@@ -0,0 +1,93 @@
+"""
+Per-user cache of the report results ("filter_by_daterange", "get_daily_activity").
+
+Cache keys contain a generation counter of the user, which is bumped in every
+transaction that writes shots of the user, so a cached result never outlives a new shot.
+"""
+from functools import lru_cache
+import threading
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, pre_delete, post_delete
+
+from core.cache import SharedVersion
+from core.models import DeltaShotReport, ScoreShotReport, Practice
+
+
+REPORT_CACHE_TIMEOUT = 60 * 60 * 24
+
+_deleting = threading.local()
+
+
+def get_generation(user_id):
+    return SharedVersion('report:generation:%s' % user_id)
+
+
+def invalidate_reports(user_id):
+    """
+    Drops the cached reports of the user, when the current transaction commits.
+    """
+    get_generation(user_id).bump()
+
+
+def cached_report(user_id, endpoint, params, compute):
+    """
+    :param endpoint: name of the report
+    :param params: normalized params of the request (e.g. dates in ISO format)
+    :param compute: function returning the result (picklable) when it's not cached
+    """
+    key = 'report:%s:%s:%s:%s' % (user_id, get_generation(user_id).get(), endpoint, ':'.join(params))
+
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, REPORT_CACHE_TIMEOUT)
+    return result
+
+
+@lru_cache(maxsize=10000)
+def practice_user_id(practice_id):
+    """
+    :return: user id of the practice (never changes), None if it doesn't exist
+    """
+    return Practice.objects.filter(pk=practice_id).values_list('user_id', flat=True).first()
+
+
+def deleting_practices():
+    """
+    :return: ids of the practices being deleted in this thread
+    """
+    if not hasattr(_deleting, 'practices'):
+        _deleting.practices = set()
+    return _deleting.practices
+
+
+def invalidate_shot_reports(sender, instance, **kwargs):
+    if instance.practice_id in deleting_practices():
+        return  # NOTE: deleted with its practice, invalidated once by invalidate_practice_reports
+
+    user_id = practice_user_id(instance.practice_id)
+    if user_id is not None:
+        invalidate_reports(user_id)
+
+
+def invalidate_practice_reports(sender, instance, **kwargs):
+    # NOTE: pre_delete of the practice is sent before its shots are deleted
+    deleting_practices().add(instance.pk)
+    invalidate_reports(instance.user_id)
+
+
+def practice_deleted(sender, instance, **kwargs):
+    deleting_practices().discard(instance.pk)
+
+
+def connect_signals():
+    """
+    Shots changed one by one (e.g. in the admin) or with their practice. Bulk writes call invalidate_reports themselves.
+    """
+    for model in (DeltaShotReport, ScoreShotReport):
+        post_save.connect(invalidate_shot_reports, sender=model, dispatch_uid='report_cache_save_%s' % model.__name__)
+        post_delete.connect(invalidate_shot_reports, sender=model, dispatch_uid='report_cache_delete_%s' % model.__name__)
+
+    pre_delete.connect(invalidate_practice_reports, sender=Practice, dispatch_uid='report_cache_delete_practice')
+    post_delete.connect(practice_deleted, sender=Practice, dispatch_uid='report_cache_deleted_practice')
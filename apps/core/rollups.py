@@ -0,0 +1,190 @@
+"""
+Maintenance of ShotRollup and ShotHourRollup rows.
+
+Reports are folded into per (user, day, practice type, bucket, club) and per
+(user, day, hour) counters in the same transaction as the insert. Days and hours
+are in the timezone of the user. "rebuild_shot_rollups" recomputes them from the
+shots with the same functions. When a user changes timezone, "rebuild_shot_rollups
+--stale" (run every few minutes) rebuilds the users whose rollups are still in
+another timezone (User.rollups_timezone).
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction, IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from constant.registry import get_constants
+from core.models import ShotRollup, ShotHourRollup, DeltaShotReport, ScoreShotReport
+from core.report_cache import invalidate_reports
+from core.utils import is_full_swing
+
+COUNTER_FIELDS = (
+    'shots', 'hits', 'points', 'distance_sum',
+    'distance_acc_count', 'distance_acc_sum',
+    'aim_acc_count', 'aim_acc_sum',
+    'trajectory_acc_count', 'trajectory_acc_sum',
+)
+KEY_FIELDS = ('day', 'practice_type', 'bucket', 'club')
+HOUR_KEY_FIELDS = ('day', 'hour')
+
+User = get_user_model()
+
+
+def find_bucket(buckets, practice_type, distance):
+    """
+    :return: id of the yard bucket (min <= distance < max) for full swing shots, otherwise 0
+    """
+    if not is_full_swing(practice_type):
+        return 0
+    for bucket in buckets:
+        if bucket.min <= distance < bucket.max:
+            return bucket.pk
+    return 0
+
+
+def empty_values():
+    values = dict.fromkeys(COUNTER_FIELDS, 0)
+    values['max_distance'] = 0
+    return values
+
+
+def add_delta_values(totals, hour_totals, buckets, tz, practice_type, reported_at, distance, club, hit, accuracies):
+    """
+    :param tz: timezone of the user
+    :param accuracies: (distance_accuracy, aim_accuracy, trajectory_accuracy) of the shot
+    """
+    local_time = timezone.localtime(reported_at, tz)
+
+    hour_values = hour_totals.setdefault((local_time.date(), local_time.hour), {'shots': 0, 'hits': 0})
+    hour_values['shots'] += 1
+    hour_values['hits'] += hit
+
+    key = (
+        local_time.date(),
+        practice_type,
+        find_bucket(buckets, practice_type, distance),
+        club or '',
+    )
+    values = totals.setdefault(key, empty_values())
+
+    values['shots'] += 1
+    values['hits'] += hit
+    values['distance_sum'] += distance
+    values['max_distance'] = max(values['max_distance'], distance)
+
+    for name, flag in zip(('distance', 'aim', 'trajectory'), accuracies):
+        if flag is not None:
+            values['%s_acc_count' % name] += 1
+            values['%s_acc_sum' % name] += flag
+
+
+def add_score_values(totals, tz, practice_type, reported_at, points):
+    key = (timezone.localdate(reported_at, tz), practice_type, 0, '')
+    values = totals.setdefault(key, empty_values())
+
+    values['shots'] += 1
+    values['points'] += points
+
+
+def apply_totals(user_id, totals, model=ShotRollup, key_fields=KEY_FIELDS):
+    """
+    :param totals: {key: values} to add to the rollups of the user, e.g. {(day, practice_type, bucket, club): values}
+    """
+    with transaction.atomic():
+        for key, values in totals.items():
+            lookup = dict(zip(key_fields, key), user_id=user_id)
+
+            updates = {field: F(field) + value for field, value in values.items() if field != 'max_distance' and value}
+            if 'max_distance' in values:
+                updates['max_distance'] = Greatest('max_distance', Value(values['max_distance']))
+
+            if model.objects.filter(**lookup).update(**updates):
+                continue
+
+            try:
+                with transaction.atomic():
+                    model.objects.create(**lookup, **values)
+            except IntegrityError:  # created by a concurrent report
+                model.objects.filter(**lookup).update(**updates)
+
+
+def add_delta_shots(practice, shots):
+    """
+    :param shots: saved DeltaShotReport objects of the practice
+    """
+    buckets = get_constants().yard_buckets
+    tz = practice.user.tzinfo
+    totals = {}
+    hour_totals = {}
+    for shot in shots:
+        add_delta_values(totals, hour_totals, buckets, tz, practice.practice_type,
+                         shot.reported_at, shot.distance, shot.club, shot.hit,
+                         (shot.distance_accuracy, shot.aim_accuracy, shot.trajectory_accuracy))
+    apply_totals(practice.user_id, totals)
+    apply_totals(practice.user_id, hour_totals, ShotHourRollup, HOUR_KEY_FIELDS)
+
+
+def add_score_shots(practice, shots):
+    """
+    :param shots: saved ScoreShotReport objects of the practice
+    """
+    tz = practice.user.tzinfo
+    totals = {}
+    for shot in shots:
+        add_score_values(totals, tz, practice.practice_type, shot.reported_at, shot.points)
+    apply_totals(practice.user_id, totals)
+
+
+def rebuild_rollups(user_ids):
+    """
+    Recompute the rollups of the users from their shots.
+    """
+    buckets = get_constants().yard_buckets
+    users = list(User.objects.filter(pk__in=user_ids).only('timezone'))
+    timezones = {user.pk: user.tzinfo for user in users}
+    totals = {}
+    hour_totals = {}
+
+    delta_shots = DeltaShotReport.objects.filter(practice__user_id__in=user_ids).order_by().values_list(
+        'practice__user_id', 'practice__practice_type', 'reported_at', 'distance', 'club', 'hit',
+        'distance_accuracy', 'aim_accuracy', 'trajectory_accuracy')
+    for user_id, practice_type, reported_at, distance, club, hit, *accuracies in delta_shots.iterator():
+        add_delta_values(totals.setdefault(user_id, {}), hour_totals.setdefault(user_id, {}), buckets,
+                         timezones[user_id], practice_type, reported_at, distance, club, hit, accuracies)
+
+    score_shots = ScoreShotReport.objects.filter(practice__user_id__in=user_ids).order_by().values_list(
+        'practice__user_id', 'practice__practice_type', 'reported_at', 'points')
+    for user_id, practice_type, reported_at, points in score_shots.iterator():
+        add_score_values(totals.setdefault(user_id, {}), timezones[user_id], practice_type, reported_at, points)
+
+    rollups = [
+        ShotRollup(user_id=user_id, day=day, practice_type=practice_type, bucket=bucket, club=club, **values)
+        for user_id, user_totals in totals.items()
+        for (day, practice_type, bucket, club), values in user_totals.items()
+    ]
+    hour_rollups = [
+        ShotHourRollup(user_id=user_id, day=day, hour=hour, **values)
+        for user_id, user_totals in hour_totals.items()
+        for (day, hour), values in user_totals.items()
+    ]
+
+    with transaction.atomic():
+        ShotRollup.objects.filter(user_id__in=user_ids).delete()
+        ShotRollup.objects.bulk_create(rollups, batch_size=1000)
+        ShotHourRollup.objects.filter(user_id__in=user_ids).delete()
+        ShotHourRollup.objects.bulk_create(hour_rollups, batch_size=1000)
+
+        # NOTE: the time zone read above, a change made meanwhile leaves the user stale for --stale
+        users_by_timezone = defaultdict(list)
+        for user in users:
+            users_by_timezone[user.timezone].append(user.pk)
+        for name, ids in users_by_timezone.items():
+            User.objects.filter(pk__in=ids).update(rollups_timezone=name)
+
+        for user_id in user_ids:
+            invalidate_reports(user_id)
+
+    return len(rollups)
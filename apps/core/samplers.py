@@ -0,0 +1,188 @@
+"""
+Distance samplers for the practice generators.
+
+A sampler picks up to N distances in every bucket (preferring distances which
+are not used yet in the practice), then merges the buckets round-robin in a
+random bucket order.
+
+* SetDistanceSampler: reference implementation on top of AbstractBucket.pick_dists
+* NumpyDistanceSampler: keeps the bucket domains in preallocated arrays and draws all buckets at once
+"""
+import random
+
+import numpy as np
+from django.conf import settings
+
+
+class SetDistanceSampler(object):
+    """
+    Picks distances bucket by bucket with python sets (AbstractBucket.pick_dists / FeetBucket.pick_standard_dists)
+    """
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+
+    def _shuffled_order(self):
+        bucket_order = [bucket.pk for bucket in self.buckets]
+        random.shuffle(bucket_order)
+        return bucket_order
+
+    def pick(self, excepted_dist_list, max_limit=None):
+        """
+        :param excepted_dist_list: distances already used in the practice
+        :param max_limit: All of the picked distances should not be greater than max_limit.
+        :return: round-robin merged distances, stops at the first round which reaches PICK_COUNT
+        """
+        new_dist = {}
+        for bucket in self.buckets:
+            new_dist[bucket.pk] = bucket.pick_dists(excepted_dist_list, max_limit)
+
+        bucket_order = self._shuffled_order()
+
+        final_dist_list = []
+        while True:
+            old_count = len(final_dist_list)
+            for bucket_pk in bucket_order:
+                try:
+                    final_dist_list.append(new_dist[bucket_pk].pop())
+                except IndexError:  # pop from empty list
+                    pass
+            if len(final_dist_list) >= settings.PICK_COUNT:
+                break
+            if len(final_dist_list) == old_count:  # not be appended anymore
+                break
+
+        return final_dist_list
+
+    def pick_standard(self, excepted_dist_list):
+        """
+        :param excepted_dist_list: distances already used in the practice
+        :return: round-robin merged distances of "pick_standard_dists", at most 3 rounds
+        """
+        new_dist = {}
+        for bucket in self.buckets:
+            new_dist[bucket.pk] = bucket.pick_standard_dists(excepted_dist_list)
+
+        bucket_order = self._shuffled_order()
+
+        final_dist_list = []
+        for bucket_pk in bucket_order * 3:  # NOTE: hardcoded 3.
+            try:
+                final_dist_list.append(new_dist[bucket_pk].pop())
+            except IndexError:  # pop from empty list
+                pass
+
+        return final_dist_list
+
+
+class NumpyDistanceSampler(object):
+    """
+    SetDistanceSampler vectorized over all buckets.
+
+    The distances of every bucket are concatenated into one array (`dists`) with the
+    bucket index of each distance in `owner`; used distances are masked out with np.isin.
+    Every bucket gives the same number of distances as pick_dists (PICK_COUNT) and
+    pick_standard_dists (percent + 5%), the same fresh and used distances, and in the
+    same pop order: the used distances added to a bucket short of fresh ones come out
+    first. NOTE: the fresh distances of such a bucket come out in random order, not
+    in the iteration order of a python set.
+    """
+
+    def __init__(self, buckets):
+        buckets = list(buckets)
+
+        lows = np.array([bucket.min for bucket in buckets], dtype=np.int64)
+        highs = np.array([bucket.max for bucket in buckets], dtype=np.int64)
+        sizes = np.clip(highs - lows + 1, 0, None)
+
+        self.bucket_count = len(buckets)
+        self.owner = np.repeat(np.arange(self.bucket_count), sizes)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int64)
+        self.dists = np.arange(int(sizes.sum())) - starts[self.owner] + lows[self.owner]
+
+        self.pick_counts = np.full(self.bucket_count, settings.PICK_COUNT, dtype=np.int64)
+        self.standard_counts = np.array(
+            [round(settings.PICK_COUNT * (bucket.percent + 5) / 100) for bucket in buckets], dtype=np.int64)
+
+    def _draw(self, excepted_dist_list, counts, max_limit=None):
+        """
+        :return: (distances, bucket indexes, ranks) picked in every bucket, rank is the pop order of SetDistanceSampler
+        """
+        dists = self.dists
+        owner = self.owner
+
+        if max_limit is not None:
+            allowed = dists <= max_limit
+            dists = dists[allowed]
+            owner = owner[allowed]
+
+        used = np.isin(dists, np.asarray(excepted_dist_list if excepted_dist_list is not None else [], dtype=np.int64))
+
+        # pick the fresh distances first, then used ones, random order inside each group
+        keys = used + np.random.random_sample(len(dists))
+        order = np.lexsort((keys, owner))
+        dists, owner, used = dists[order], owner[order], used[order]
+
+        rank = np.arange(len(owner)) - np.searchsorted(owner, owner)
+        picked = rank < counts[owner]
+        dists, owner, used = dists[picked], owner[picked], used[picked]
+
+        # pop order: pick_dists returns diff_list + used ones and pick() pops from the end (lexsort is stable)
+        order = np.lexsort((~used, owner))
+        dists, owner = dists[order], owner[order]
+        rank = np.arange(len(owner)) - np.searchsorted(owner, owner)
+
+        return dists, owner, rank
+
+    def _round_robin(self, dists, owner, rank, max_rounds=None, target=None):
+        position = np.empty(self.bucket_count, dtype=np.int64)
+        position[np.random.permutation(self.bucket_count)] = np.arange(self.bucket_count)
+
+        if max_rounds is not None:
+            keep = rank < max_rounds
+            dists, owner, rank = dists[keep], owner[keep], rank[keep]
+
+        order = np.lexsort((position[owner], rank))
+        dists, rank = dists[order], rank[order]
+
+        if target is not None and len(rank):
+            # keep whole rounds until PICK_COUNT is reached
+            last_round = np.searchsorted(np.cumsum(np.bincount(rank)), target)
+            dists = dists[rank <= last_round]
+
+        return dists.tolist()
+
+    def pick(self, excepted_dist_list, max_limit=None):
+        dists, owner, rank = self._draw(excepted_dist_list, self.pick_counts, max_limit)
+        return self._round_robin(dists, owner, rank, target=settings.PICK_COUNT)
+
+    def pick_standard(self, excepted_dist_list):
+        dists, owner, rank = self._draw(excepted_dist_list, self.standard_counts)
+        return self._round_robin(dists, owner, rank, max_rounds=3)  # NOTE: hardcoded 3.
+
+
+SAMPLERS = {
+    'set': SetDistanceSampler,
+    'numpy': NumpyDistanceSampler,
+}
+
+_samplers = {}
+
+
+def get_distance_sampler(buckets, kind=None):
+    """
+    :param buckets: bucket objects (e.g: get_constants().yard_buckets)
+    :param kind: 'set' or 'numpy', default: settings.DISTANCE_SAMPLER
+    :return: sampler for the buckets, reused while the buckets don't change
+    """
+    kind = kind or getattr(settings, 'DISTANCE_SAMPLER', 'numpy')
+    key = (kind, tuple((bucket.pk, bucket.min, bucket.max, bucket.percent) for bucket in buckets))
+
+    sampler = _samplers.get(key)
+    if sampler is None:
+        if len(_samplers) > 32:  # stale bucket configurations
+            _samplers.clear()
+        sampler = SAMPLERS[kind](buckets)
+        _samplers[key] = sampler
+
+    return sampler
@@ -1,3 +1,159 @@
-from django.test import TestCase
+import json
+import random
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from constant.models import YardBucket, FeetBucket
+from core.management.commands.bench_groupby2dict import groupby2dict_rows, make_level
+from core.samplers import SetDistanceSampler, NumpyDistanceSampler
+from core.utils import groupby2dict
+
+
+def make_buckets(model, bounds, percent):
+    return [model(pk=i + 1, min=low, max=high, percent=percent) for i, (low, high) in enumerate(bounds)]
+
+
+def numpy_bucket_picks(sampler, excepted, counts, max_limit=None):
+    """
+    :return: distances of every bucket in pop order, e.g. [[102, 87, 95], [130, ...]]
+    """
+    dists, owner, rank = sampler._draw(excepted, counts, max_limit)
+    picks = [[] for i in range(sampler.bucket_count)]
+    for dist, index in zip(dists.tolist(), owner.tolist()):  # NOTE: grouped by bucket in rank order
+        picks[index].append(dist)
+    return picks
+
+
+def pick_summary(picks, bucket, excepted, count, max_limit=None):
+    """
+    :return: parts of a bucket pick that don't depend on the random draws:
+             size, used/fresh pop order, and the distances when they are all fresh ones or the whole bucket
+    """
+    high = bucket.max if max_limit is None else min(bucket.max, max_limit)
+    domain = set(range(bucket.min, high + 1))
+    fresh = domain - set(excepted)
+
+    picked_fresh = {dist for dist in picks if dist in fresh}
+    return (
+        len(picks),
+        [dist not in fresh for dist in picks],
+        picked_fresh if len(fresh) <= count else len(picked_fresh),
+        sorted(picks) if len(domain) <= count else None,
+    )
+
+
+class DistanceSamplerTest(SimpleTestCase):
+    """
+    NumpyDistanceSampler picks like SetDistanceSampler in every bucket (seeded, the draws differ).
+    """
+
+    def setUp(self):
+        random.seed(1)
+        np.random.seed(1)
+        self.yard_buckets = make_buckets(YardBucket, [(75, 99), (100, 104), (105, 129), (130, 139)], 25)
+        self.feet_buckets = make_buckets(FeetBucket, [(3, 5), (6, 10), (11, 15), (16, 20), (21, 25)], 15)
+
+    def excepted_lists(self, low, high):
+        domain = list(range(low, high + 1))
+        return [[], random.sample(domain, len(domain) // 3), random.sample(domain, len(domain) - 3), domain]
+
+    def test_pick_buckets(self):
+        sampler = NumpyDistanceSampler(self.yard_buckets)
+        count = settings.PICK_COUNT
+
+        for excepted in self.excepted_lists(75, 139):
+            for max_limit in (None, 120, 70):
+                expected = [
+                    pick_summary(bucket.pick_dists(excepted, max_limit)[::-1], bucket, excepted, count, max_limit)
+                    for bucket in self.yard_buckets]
+                picks = numpy_bucket_picks(sampler, excepted, sampler.pick_counts, max_limit)
+                result = [
+                    pick_summary(bucket_picks, bucket, excepted, count, max_limit)
+                    for bucket_picks, bucket in zip(picks, self.yard_buckets)]
+
+                self.assertEqual(result, expected, (excepted, max_limit))
+
+    def test_pick_standard_buckets(self):
+        sampler = NumpyDistanceSampler(self.feet_buckets)
+
+        for excepted in self.excepted_lists(3, 25):
+            expected = []
+            result = []
+            for bucket, bucket_picks, count in zip(
+                    self.feet_buckets,
+                    numpy_bucket_picks(sampler, excepted, sampler.standard_counts),
+                    sampler.standard_counts.tolist()):
+                expected.append(pick_summary(bucket.pick_standard_dists(excepted)[::-1], bucket, excepted, count))
+                result.append(pick_summary(bucket_picks, bucket, excepted, count))
+
+            self.assertEqual(result, expected, excepted)
+
+    def test_round_robin(self):
+        for excepted in self.excepted_lists(75, 139):
+            for max_limit in (None, 120):
+                set_dists = SetDistanceSampler(self.yard_buckets).pick(excepted, max_limit)
+                numpy_dists = NumpyDistanceSampler(self.yard_buckets).pick(excepted, max_limit)
+                self.assertEqual(len(numpy_dists), len(set_dists))
+
+        for excepted in self.excepted_lists(3, 25):
+            set_dists = SetDistanceSampler(self.feet_buckets).pick_standard(excepted)
+            numpy_dists = NumpyDistanceSampler(self.feet_buckets).pick_standard(excepted)
+            self.assertEqual(len(numpy_dists), len(set_dists))
+
+
+def make_grouped(rows, level_kinds, rng):
+    """
+    :return: df.groupby(keys)[column].agg(['mean']) of param:rows random rows
+    """
+    df = pd.DataFrame({kind: rng.choice(make_level(kind, size), rows) for kind, size in level_kinds})
+    df['value'] = rng.random_sample(rows)
+    return df.groupby([kind for kind, _ in level_kinds])['value'].agg(['mean'])
+
+
+class GroupbyToDictTest(SimpleTestCase):
+    """
+    groupby2dict (from the level codes) returns the same dicts as the previous row by row implementation.
+    """
+
+    def assertSameDicts(self, grouped):
+        # NOTE: compared as JSON, NaN != NaN and the key order must be the same
+        self.assertEqual(json.dumps(groupby2dict(grouped)), json.dumps(groupby2dict_rows(grouped)), grouped)
+
+    def test_random_frames(self):
+        rng = np.random.RandomState(0)
+        random.seed(0)
+
+        # 2-3 levels, small and skewed sizes
+        for trial in range(200):
+            kinds = random.sample(['club', 'day', 'feet'], random.randint(2, 3))
+            level_kinds = [(kind, random.randint(1, 12)) for kind in kinds]
+            self.assertSameDicts(make_grouped(random.randint(1, 300), level_kinds, rng))
+
+    def test_empty_frame(self):
+        index = pd.MultiIndex.from_arrays([[], []], names=['club', 'day'])
+        grouped = pd.DataFrame({'mean': []}, index=index)
+        self.assertEqual(groupby2dict(grouped), {})
+        self.assertEqual(groupby2dict_rows(grouped), {})
+
+    def test_nan_values(self):
+        df = pd.DataFrame({
+            'club': ['Driver', 'Driver', 'Iron 7', 'Iron 7'],
+            'day': ['2018-05-01', '2018-05-02', '2018-05-01', '2018-05-02'],
+            'value': [1.0, np.nan, np.nan, 0.5],
+        })
+        grouped = df.groupby(['club', 'day'])['value'].agg(['mean'])
+        self.assertSameDicts(grouped)
+        self.assertTrue(np.isnan(groupby2dict(grouped)['Iron 7']['2018-05-01']))
+
+    def test_duplicate_keys(self):
+        # the last value of a key wins, also when its run of rows is interrupted by another key
+        index = pd.MultiIndex.from_tuples([
+            ('Driver', '2018-05-01'), ('Driver', '2018-05-01'), ('Iron 7', '2018-05-01'),
+            ('Driver', '2018-05-02'), ('Driver', '2018-05-02'),
+        ], names=['club', 'day'])
+        grouped = pd.DataFrame({'mean': [1.0, 2.0, 3.0, 4.0, 5.0]}, index=index)
+        self.assertSameDicts(grouped)
+        self.assertEqual(groupby2dict(grouped), {'Driver': {'2018-05-02': 5.0}, 'Iron 7': {'2018-05-01': 3.0}})
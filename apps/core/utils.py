@@ -1,61 +1,39 @@
 from django.conf import settings
+from django.db import connection
+from django.db.models import Sum, Count, Q
 import random
 import pycountry
 import numpy as np
 
-from constant.models import YardBucket, FeetBucket
-from core.models import PRACTICE_TYPES, DeltaShotReport, Practice
+from constant.registry import get_constants
+from core.models import PRACTICE_TYPES, PRACTICE_CATEGORIES, FULL_SWING_PRACTICE_TYPES, SHORT_GAME_PRACTICE_TYPES, \
+    DeltaShotReport, Practice, ShotRollup
+from core.samplers import get_distance_sampler
 from profiles.models import ClubBag
 
-def pick_random_distances(putting=False, practice=None, driver=None, clubs=None):
+def pick_random_distances(putting=False, practice=None, driver=None, club_index=None, sampler=None):
+    """
+    :param club_index: ClubIndex of the user (see profiles.club_index), adds distances between the clubs
+    :param sampler: 'set' or 'numpy' (see core.samplers), default: settings.DISTANCE_SAMPLER
+    """
     # get existing dist_list
     # --- e.g: 75, 128, 103, 155, 189, 140, 170, 105, 200, 240, 85, 110, 185, 133, 160, 350, 70, 162, 120, 130
     if practice is None:
         existing_dist_list = []
     else:
-        existing_dist_list = DeltaShotReport.objects.filter(practice=practice).values_list('distance', flat=True)
-        if len(existing_dist_list) > 0:
-            existing_dist_list = list(set(existing_dist_list))
+        existing_dist_list = practice.get_existing_dist_list()
 
     # pick_number e.g: [1,2,2,2,1,1,2]
     if putting:
-        buckets = FeetBucket.objects.all()
+        buckets = get_constants().feet_buckets
     else:
-        buckets = YardBucket.objects.all()
-
-    # get new distance in every bucket
-    new_dist = {}
-    final_dist_list = []
-    clubs_list = clubs.all()
-    club_dist_list = []
-    rest_dist_list = []
-
-    if len(clubs.all()):
-        for club in reversed(clubs_list):
-            club_dist_list.append(club.avg_dist)
-        for i in range(len(club_dist_list)-1):
-            random_choose_dist = random.choice(list(range(club_dist_list[i], club_dist_list[i+1])))
-            if random_choose_dist >= 75:
-                rest_dist_list.append(random_choose_dist)
-
-    for bucket in buckets:
-        new_dist[bucket.pk] = bucket.pick_dists(existing_dist_list, driver)
-
-    # randomize by bucket order
-    bucket_order = list(buckets.values_list('pk', flat=True))
-    random.shuffle(bucket_order)
-
-    while True:
-        old_count = len(final_dist_list)
-        for bucket_pk in bucket_order:
-            try:
-                final_dist_list.append(new_dist[bucket_pk].pop())
-            except IndexError:  # pop from empty list
-                pass
-        if len(final_dist_list) >= settings.PICK_COUNT:
-            break
-        if len(final_dist_list) == old_count:  # not be appended anymore
-            break
+        buckets = get_constants().yard_buckets
+
+    # distances between clubs
+    rest_dist_list = club_index.pick_gap_distances() if club_index is not None else []
+
+    # get new distance in every bucket, merged by random bucket order
+    final_dist_list = get_distance_sampler(buckets, sampler).pick(existing_dist_list, driver)
 
     final_dist_list = final_dist_list + rest_dist_list
     random.shuffle(final_dist_list)
@@ -71,29 +49,15 @@ def pick_random_distances(putting=False, practice=None, driver=None, clubs=None)
     return final_dist_list
 
 
-def pick_standard_putts(practice=None):
+def pick_standard_putts(practice=None, sampler=None):
     if practice is None:
         existing_dist_list = []
     else:
         existing_dist_list = practice.get_existing_dist_list()
 
-    buckets = FeetBucket.objects.filter(max__lte=25)  # NOTE: hardcode 25
-    # get new distance in every bucket
-    new_dist = {}
-    for bucket in buckets:
-        new_dist[bucket.pk] = bucket.pick_standard_dists(existing_dist_list)
-
-    # randomize by bucket order
-    bucket_order = list(buckets.values_list('pk', flat=True))
-    random.shuffle(bucket_order)
-
-    final_dist_list = []
-    for bucket_pk in bucket_order * 3:  # NOTE: hardcoded 3.
-        try:
-            final_dist_list.append(new_dist[bucket_pk].pop())
-
-        except IndexError:  # pop from empty list
-            pass
+    buckets = [bucket for bucket in get_constants().feet_buckets if bucket.max <= 25]  # NOTE: hardcode 25
+    # get new distance in every bucket, merged by random bucket order
+    final_dist_list = get_distance_sampler(buckets, sampler).pick_standard(existing_dist_list)
 
     # if length > PICK_COUNT, randomly pop
     _length = len(final_dist_list)
@@ -113,49 +77,80 @@ def pick_pitch_distances(practice=None):
     return random.sample(set(range(25, 75)), 10)
 
 
-def get_blocked_bin(user=None):
+BLOCK_PRACTICE_TYPES = [PRACTICE_TYPES.random, PRACTICE_TYPES.block, PRACTICE_TYPES.serial, PRACTICE_TYPES.custom]
+BLOCK_SHOT_WINDOW = 10  # last N shots of every bucket
+BLOCK_MISS_RATIO = 0.3
+
+
+def get_recent_bucket_stats(user, buckets, window=BLOCK_SHOT_WINDOW):
     """
-    :return: bin for block practice. NOTE: first bin (check again later.)
+    :param buckets: yard buckets, shots are in a bucket if min <= distance < max
+    :param window: only the last `window` shots of every bucket are counted
+    :return: (totals, misses) numpy arrays, one item per bucket
     """
-    if user is None:
-        return None
-
-    bin_list = YardBucket.get_hist_bin()
-    practice_list = Practice.objects.filter(
-        user=user,
-        practice_type__in=[PRACTICE_TYPES.random, PRACTICE_TYPES.block, PRACTICE_TYPES.serial, PRACTICE_TYPES.custom]
+    totals = np.zeros(len(buckets), dtype=np.int64)
+    misses = np.zeros(len(buckets), dtype=np.int64)
+    if not buckets:
+        return totals, misses
+
+    params = []
+    for index, bucket in enumerate(buckets):
+        params += [index, bucket.min, bucket.max]
+    params += [user.pk] + BLOCK_PRACTICE_TYPES + [window]
+
+    sql = """
+        SELECT bucket, COUNT(*), SUM(CASE WHEN hit = 0 THEN 1 ELSE 0 END)
+        FROM (
+            SELECT b.bucket, s.hit,
+                   ROW_NUMBER() OVER (PARTITION BY b.bucket ORDER BY s.reported_at DESC) AS shot_rank
+            FROM {shot} s
+            INNER JOIN {practice} p ON p.id = s.practice_id
+            INNER JOIN (VALUES {values}) AS b (bucket, low, high) ON s.distance >= b.low AND s.distance < b.high
+            WHERE p.user_id = %s AND p.practice_type IN ({types})
+        ) AS recent
+        WHERE shot_rank <= %s
+        GROUP BY bucket
+    """.format(
+        shot=DeltaShotReport._meta.db_table,
+        practice=Practice._meta.db_table,
+        values=', '.join(['(%s, %s, %s)'] * len(buckets)),
+        types=', '.join(['%s'] * len(BLOCK_PRACTICE_TYPES)),
     )
 
-    block_bin = None
-    yards = YardBucket.objects.all()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for index, total, missed in cursor.fetchall():
+            totals[index] = total
+            misses[index] = missed
 
-    for yard in yards:
-        all_shots1 = DeltaShotReport.objects.filter(
-            practice__in=practice_list).filter(distance__in=range(yard.min, yard.max)).order_by("-reported_at")
-        all_shots = all_shots1[0:10]
-        all_dists = [shot.distance for shot in all_shots]
-        hit_dists = [shot.distance for shot in all_shots if shot.hit == 0]
+    return totals, misses
 
-        total_hist, bins = np.histogram(all_dists, bins=bin_list)
-        hit_hist, bins = np.histogram(hit_dists, bins=bin_list)
 
-        for h, t, b in zip(hit_hist, total_hist, bin_list):
-            if t != 0:
-                if t < 10 or h / t < 0.3:
-                    continue
+def get_blocked_bin(user=None):
+    """
+    :return: first bucket whose last 10 shots have a miss ratio of 30% or more, None if there is no such bucket
+    """
+    if user is None:
+        return None
 
-                # if len(hit_dists):
-                #     if sum(hit_dists) / len(hit_dists) > 224:
-                #         block_bin = YardBucket.objects.get(min=196)
-                #         break
+    # only buckets with enough shots can be blocked
+    shot_counts = dict(
+        ShotRollup.objects.filter(user=user, practice_type__in=BLOCK_PRACTICE_TYPES, bucket__gt=0)
+        .order_by().values_list('bucket').annotate(Sum('shots'))
+    )
+    yards = [yard for yard in get_constants().yard_buckets if shot_counts.get(yard.pk, 0) >= BLOCK_SHOT_WINDOW]
+    if not yards:
+        return None
 
-                block_bin = YardBucket.objects.get(min=b)
-                break
+    totals, misses = get_recent_bucket_stats(user, yards)
 
-        if block_bin is not None:
-            break
+    blocked = (totals >= BLOCK_SHOT_WINDOW) & (misses >= BLOCK_MISS_RATIO * totals)
+    blocked_index = np.flatnonzero(blocked)
 
-    return block_bin
+    if len(blocked_index) == 0:
+        return None
+
+    return yards[blocked_index[0]]
 
 
 def pick_custom_distances(min, max):
@@ -175,12 +170,7 @@ def is_full_swing(p_type):
     :param p_type: practice_type
     :return: True/False
     """
-    if p_type in [PRACTICE_TYPES.random, PRACTICE_TYPES.warmup,
-                  PRACTICE_TYPES.serial, PRACTICE_TYPES.block,
-                  PRACTICE_TYPES.custom]:
-        return True
-    else:
-        return False
+    return p_type in FULL_SWING_PRACTICE_TYPES
 
 
 def is_short_game(p_type):
@@ -188,10 +178,19 @@ def is_short_game(p_type):
     :param p_type: practice_type
     :return: True/False
     """
-    if p_type in [PRACTICE_TYPES.chip, PRACTICE_TYPES.pitch]:
-        return True
-    else:
-        return False
+    return p_type in SHORT_GAME_PRACTICE_TYPES
+
+
+def count_practice_sessions(practices):
+    """
+    :param practices: Practice queryset
+    :return: {'long': n, 'short': n, 'putting': n}, sessions with at least one report, counted in one query
+    NOTE: relies on Practice.shot_count (standard putting is counted by its delta reports, see "check_session_counts")
+    """
+    return practices.filter(shot_count__gt=0).aggregate(**{
+        category: Count('id', filter=Q(practice_type__in=practice_types))
+        for category, practice_types in PRACTICE_CATEGORIES.items()
+    })
 
 
 def get_country_list():
@@ -206,26 +205,47 @@ def get_country_list():
     return country_list
 
 
-def groupby2dict(grouped_df):
-    levels = len(grouped_df.index.levels)
-    dicts = [{} for i in range(levels)]
-    last_index = None
-
-    for index, value in grouped_df.itertuples():
-
-        if not last_index:
-            last_index = index
-
-        for (ii, (i, j)) in enumerate(zip(index, last_index)):
-            if not i == j:
-                ii = levels - ii - 1
-                dicts[:ii] = [{} for _ in dicts[:ii]]
-                break
+def _level_keys(index, level, codes):
+    keys = np.empty(len(index.levels[level]), dtype=object)
+    keys[:] = index.levels[level].tolist()
+    return keys[codes].tolist()
 
-        for i, key in enumerate(reversed(index)):
-            dicts[i][key] = value
-            value = dicts[i]
 
-        last_index = index
-
-    return dicts[-1]
+def groupby2dict(grouped_df):
+    """
+    :param grouped_df: one column DataFrame with a MultiIndex, e.g. df.groupby(['club', 'day'])['hit'].agg(['mean'])
+    :return: nested dicts, e.g. {club: {day: mean}}
+    NOTE: the dicts are built per run of equal index prefixes (from the level codes), not per row
+    """
+    index = grouped_df.index
+    values = grouped_df.iloc[:, 0].tolist()
+    if not values:
+        return {}
+
+    codes = [np.asarray(c) for c in (index.codes if hasattr(index, 'codes') else index.labels)]
+    levels = len(codes)
+
+    # starts[i]: rows where the prefix (levels 0..i) differs from the previous row
+    starts = []
+    changed = np.zeros(len(values), dtype=bool)
+    changed[0] = True
+    for level_codes in codes[:-1]:
+        changed[1:] |= level_codes[1:] != level_codes[:-1]
+        starts.append(np.flatnonzero(changed))
+    starts = [np.array([0])] + starts
+
+    # leaf dicts, one per run of the parent prefix
+    child_starts = starts[-1]
+    bounds = child_starts.tolist() + [len(values)]
+    leaf_keys = _level_keys(index, levels - 1, codes[-1])
+    children = [dict(zip(leaf_keys[s:e], values[s:e])) for s, e in zip(bounds[:-1], bounds[1:])]
+
+    # wrap the children level by level
+    for level in range(levels - 2, -1, -1):
+        level_keys = _level_keys(index, level, codes[level][child_starts])
+        parent_starts = starts[level]
+        bounds = np.searchsorted(child_starts, parent_starts).tolist() + [len(child_starts)]
+        children = [dict(zip(level_keys[s:e], children[s:e])) for s, e in zip(bounds[:-1], bounds[1:])]
+        child_starts = parent_starts
+
+    return children[0]
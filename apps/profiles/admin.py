@@ -14,7 +14,7 @@ class UserAdmin(BaseUserAdmin):
         ClubBagInline,
     ]
     fieldsets = (
-        (None, {'fields': ('username', 'email', 'password', 'photo', 'image_tag', 'handicap', 'birthday', 'location', 'years_of_experience', 'creation_time')}),
+        (None, {'fields': ('username', 'email', 'password', 'photo', 'image_tag', 'handicap', 'birthday', 'location', 'years_of_experience', 'creation_time', 'timezone')}),
         # (_('Personal info'), {'fields': ()}),
         (_('Permissions'), {'fields': ('is_active', 'is_staff', 'is_superuser')}),
         (_('Important dates'), {'fields': ('last_login', 'date_joined')}),
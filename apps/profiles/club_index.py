@@ -0,0 +1,76 @@
+"""
+Per-user index of the club bag for the practice generators.
+
+The average distances of the clubs of a user are kept sorted in the shared cache,
+so the longest (driver) distance and the gaps between clubs need no query. Saving
+or deleting a ClubBag drops the index of its owner.
+"""
+from bisect import bisect_right
+import random
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+CLUB_INDEX_TIMEOUT = 60 * 60 * 24
+MIN_GAP_DISTANCE = 75  # NOTE: distances between clubs shorter than this are not picked
+
+
+class ClubIndex(object):
+    """
+    Sorted average distances of the clubs of a user.
+    """
+
+    def __init__(self, distances):
+        self.distances = tuple(sorted(distances))
+
+    @property
+    def longest(self):
+        """
+        :return: distance of the longest club (driver), None without clubs
+        """
+        return self.distances[-1] if self.distances else None
+
+    def pick_gap_distances(self, min_dist=MIN_GAP_DISTANCE):
+        """
+        :return: one random distance between every two consecutive clubs, the ones shorter than param:min_dist left out
+        """
+        distances = self.distances
+        picked = []
+        # NOTE: gaps that end at or below min_dist can only give shorter distances, start after them
+        for i in range(max(bisect_right(distances, min_dist) - 1, 0), len(distances) - 1):
+            if distances[i] < distances[i + 1]:
+                dist = random.randrange(distances[i], distances[i + 1])
+                if dist >= min_dist:
+                    picked.append(dist)
+        return picked
+
+
+def club_index_key(user_id):
+    return 'profiles:club_index:%s' % user_id
+
+
+def get_club_index(user):
+    """
+    :return: ClubIndex of the user, kept on the user object for the rest of the request
+    """
+    index = getattr(user, '_club_index', None)
+    if index is None:
+        key = club_index_key(user.pk)
+        distances = cache.get(key)
+        if distances is None:
+            distances = tuple(sorted(user.clubs.order_by().values_list('avg_dist', flat=True)))
+            cache.set(key, distances, CLUB_INDEX_TIMEOUT)
+
+        index = user._club_index = ClubIndex(distances)
+    return index
+
+
+def invalidate_club_index(sender, instance, **kwargs):
+    key = club_index_key(instance.owner_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def connect_signals():
+    post_save.connect(invalidate_club_index, sender='profiles.ClubBag', dispatch_uid='club_index_save')
+    post_delete.connect(invalidate_club_index, sender='profiles.ClubBag', dispatch_uid='club_index_delete')
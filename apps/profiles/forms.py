@@ -1,7 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
 
-from .models import User
+from .models import User, TIMEZONE_CHOICES
 
 
 class LoginForm(AuthenticationForm):
@@ -19,12 +19,13 @@ class ProfileEditForm(forms.ModelForm):
                                attrs={'placeholder': 'MM/DD/YYYY', 'class': 'form-control date-input'}),
         required=False
     )
+    timezone = forms.ChoiceField(label='Time Zone', choices=TIMEZONE_CHOICES)
 
     class Meta:
         model = User
         fields = (
             'first_name', 'last_name',
-            'handicap', 'birthday', 'location', 'years_of_experience', 'creation_time', 'photo',
+            'handicap', 'birthday', 'location', 'years_of_experience', 'creation_time', 'photo', 'timezone',
         )
 
     def __init__(self, *args, **kwargs):
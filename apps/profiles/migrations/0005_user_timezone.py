@@ -0,0 +1,19 @@
+# Generated by Django 2.0.3 on 2026-10-18 14:20
+
+from django.db import migrations, models
+import profiles.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_user_creation_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='timezone',
+            field=models.CharField(default='UTC', help_text='Days and hours of the reports are in this time zone', max_length=64, validators=[profiles.models.validate_timezone], verbose_name='Time Zone'),
+        ),
+    ]
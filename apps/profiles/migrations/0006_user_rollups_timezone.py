@@ -0,0 +1,29 @@
+# Generated by Django 2.0.3 on 2026-10-19 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0005_user_timezone'),
+    ]
+
+    operations = [
+        # NOTE: added nullable without default so the table is not rewritten, the existing rollups are
+        # already in the time zone of their user
+        migrations.AddField(
+            model_name='user',
+            name='rollups_timezone',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunSQL(
+            'UPDATE profiles_user SET rollups_timezone = timezone',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='rollups_timezone',
+            field=models.CharField(default='UTC', editable=False, max_length=64, null=True),
+        ),
+    ]
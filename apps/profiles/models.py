@@ -1,3 +1,6 @@
+import pytz
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
@@ -7,6 +10,15 @@ from model_utils import Choices
 from django.core.files.storage import default_storage
 
 from constant.models import ClubType
+from profiles.club_index import get_club_index
+
+
+TIMEZONE_CHOICES = [(tz, tz) for tz in pytz.common_timezones]
+
+
+def validate_timezone(value):
+    if value not in pytz.all_timezones_set:
+        raise ValidationError(_('Unknown time zone: %(value)s'), params={'value': value})
 
 
 class User(AbstractUser):
@@ -17,14 +29,21 @@ class User(AbstractUser):
     location = models.CharField(_('Location'), max_length=255, null=True, blank=True)
     years_of_experience = models.IntegerField(_('Years of Experience'), default=0)
     creation_time = models.DateTimeField(_('Creation Time'), null=True, blank=True)
+    timezone = models.CharField(_('Time Zone'), max_length=64, default='UTC', validators=[validate_timezone],
+                                help_text=_('Days and hours of the reports are in this time zone'))
+    # time zone of the shot rollups, they are rebuilt when it differs from timezone (see core.rollups)
+    rollups_timezone = models.CharField(max_length=64, default='UTC', null=True, editable=False)
+
+    @property
+    def tzinfo(self):
+        return pytz.timezone(self.timezone)
 
     @property
     def longest_distance(self):
-        try:
-            driver_club = self.clubs.first()
-            return driver_club.avg_dist
-        except Exception as e:
-            return None
+        """
+        :return: average distance of the longest club (driver), None without clubs
+        """
+        return get_club_index(self).longest
 
     @property
     def photo_url(self):
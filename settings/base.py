@@ -139,6 +139,21 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
+# Cache
+# NOTE: version counters of the in-process caches are in the database (core.cache.SharedVersion)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,  # reports, entitlements and club indexes of the active users
+        },
+    },
+}
+
+
 # rest framework
 
 OAUTH2_PROVIDER = {
@@ -210,7 +225,8 @@ ADMIN_REORDER = (
         'label': 'Billing',
         'models': (
             'billing.StripeInfo',
-            'billing.BillingInfo'
+            'billing.BillingInfo',
+            'billing.StripeEvent',
         )
     },
 
@@ -252,12 +268,25 @@ ADMIN_REORDER = (
 LONG_GAME_MIN_DISTANCE = 75  # (yards)
 DIST_FOR_SHAPE = 125
 PICK_COUNT = 10
+DISTANCE_SAMPLER = 'numpy'  # 'numpy' or 'set' (see core.samplers)
+ANALYTICS_ENGINE = 'sql'  # 'sql', 'stream' or 'pandas' (see core.analytics)
 
 
 # Stripe
 # -- dev
 STRIPE_PUBLIC_KEY = '...'
 STRIPE_PRIVATE_KEY = '...'
+STRIPE_API_VERSION = '2018-02-28'  # set once in billing.gateway
+STRIPE_CLIENT = 'billing.stripe_client.StripeClient'  # billing.stripe_client.FakeStripeClient in tests/benchmarks
+STRIPE_TIMEOUT = 10  # deadline of a Stripe call, seconds (see billing.gateway)
+STRIPE_BREAKER_THRESHOLD = 5  # consecutive Stripe failures that open the circuit breaker
+STRIPE_BREAKER_RESET = 30  # seconds before a trial call once the breaker is open
+STRIPE_WEBHOOK_SECRET = '...'  # signing secret of the webhook endpoint (billing/webhook/stripe/)
+STRIPE_RECONCILE_AGE = 60 * 60 * 24  # scan_subscribers only fetches subscriptions not synced for this long
+
+# paid access (see billing.entitlements)
+ENTITLEMENT_CACHE_TTL = 60 * 10
+ENTITLEMENT_MAX_STALE = 60 * 60 * 24 * 3  # trust the last known status this long after the period end
 
 
 # Email setting